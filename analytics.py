@@ -0,0 +1,139 @@
+"""Analytics for the dashboard's daily series.
+
+The streak helpers are plain Python. DailySeries is the vectorized backend
+and needs NumPy; the apps keep pure-Python fallbacks and only use it when
+ENABLED, so a plain `pip install flask` setup still works. Set
+HABITS_ANALYTICS=python to force the fallback, e.g. when comparing output.
+"""
+import os
+from datetime import date
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional
+    np = None
+
+ENABLED = np is not None and os.environ.get('HABITS_ANALYTICS', 'numpy') != 'python'
+
+# ========== Streaks ==========
+def streak_runs(daily_data, qualifies, key='hours'):
+    """Runs of consecutive qualifying days as [start, end] day ordinals.
+
+    One pass over daily_data, which must be sorted by date with one entry per
+    day; qualifies is called with each day's value.
+    """
+    runs = []
+    for entry in daily_data:
+        if not qualifies(entry[key]):
+            continue
+        day = date.fromisoformat(entry['date']).toordinal()
+        if runs and runs[-1][1] == day - 1:
+            runs[-1][1] = day
+        else:
+            runs.append([day, day])
+    return runs
+
+def summarize_streaks(runs, today=None):
+    """(current, longest) streak lengths from streak_runs output.
+
+    The current streak is the run containing today or, if today hasn't
+    qualified yet, the run ending yesterday.
+    """
+    if not runs:
+        return 0, 0
+    longest = max(end - start + 1 for start, end in runs)
+    today = (today or date.today()).toordinal()
+    current = 0
+    for start, end in reversed(runs):
+        if start > today:
+            continue  # future-dated entries don't count
+        if end >= today:
+            current = today - start + 1
+        elif end == today - 1:
+            current = end - start + 1
+        break
+    return current, longest
+
+def streak_history(runs):
+    """JSON-friendly list of runs, oldest first."""
+    return [{
+        'start': date.fromordinal(start).isoformat(),
+        'end': date.fromordinal(end).isoformat(),
+        'days': end - start + 1
+    } for start, end in runs]
+
+class DailySeries:
+    """One habit's daily totals as NumPy arrays indexed by day ordinal.
+
+    daily_data is the list of {'date': 'YYYY-MM-DD', key: value} dicts the
+    routes already build, sorted by date with one entry per day. Results use
+    the same shapes as the pure-Python helpers so the JSON stays identical.
+    """
+
+    def __init__(self, daily_data, key='hours'):
+        self.daily_data = daily_data
+        self.key = key
+        n = len(daily_data)
+        self.ordinals = np.fromiter(
+            (date.fromisoformat(d['date']).toordinal() for d in daily_data), dtype=np.int64, count=n)
+        self.values = np.fromiter((d[key] for d in daily_data), dtype=np.float64, count=n)
+        self._weekly = None
+
+    def moving_averages(self, windows, fill_gaps=False):
+        """Same result as calculate_moving_averages, from one cumulative sum."""
+        if not self.daily_data:
+            return {window: [] for window in windows}
+
+        if fill_gaps:
+            first = int(self.ordinals[0])
+            values = np.zeros(int(self.ordinals[-1]) - first + 1)
+            values[self.ordinals - first] = self.values
+            dates = [date.fromordinal(first + i).isoformat() for i in range(values.size)]
+        else:
+            values = self.values
+            dates = [d['date'] for d in self.daily_data]
+
+        cumulative = np.concatenate(([0.0], np.cumsum(values)))
+        ends = np.arange(1, values.size + 1)
+        key = self.key
+        result = {}
+        for window in windows:
+            starts = np.maximum(ends - window, 0)
+            averages = (cumulative[ends] - cumulative[starts]) / (ends - starts)
+            result[window] = [
+                {'date': day, key: round(avg, 2)}
+                for day, avg in zip(dates, averages.tolist())
+            ]
+        return result
+
+    def streak_runs(self, threshold, at_least=True):
+        """Same result as streak_runs for a >= threshold (or <= threshold) test."""
+        qualifying = self.values >= threshold if at_least else self.values <= threshold
+        ordinals = self.ordinals[qualifying]
+        if ordinals.size == 0:
+            return []
+        breaks = np.flatnonzero(np.diff(ordinals) != 1)
+        starts = ordinals[np.concatenate(([0], breaks + 1))]
+        ends = ordinals[np.concatenate((breaks, [ordinals.size - 1]))]
+        return [list(run) for run in zip(starts.tolist(), ends.tolist())]
+
+    def weekly_totals(self):
+        """Totals per Monday-aligned week: (monday ordinals, totals)."""
+        if self._weekly is None:
+            if not self.daily_data:
+                self._weekly = np.empty(0, dtype=np.int64), np.empty(0)
+            else:
+                first = int(self.ordinals[0])
+                first_monday = first - date.fromordinal(first).weekday()
+                totals = np.bincount((self.ordinals - first_monday) // 7, weights=self.values)
+                self._weekly = first_monday + 7 * np.arange(totals.size), totals
+        return self._weekly
+
+    def week(self, week_start):
+        """(daily breakdown, total) for the Monday-aligned week starting at week_start."""
+        start = date.fromisoformat(week_start).toordinal()
+        lo, hi = (int(i) for i in np.searchsorted(self.ordinals, [start, start + 7]))
+        if lo == hi:
+            return [], 0
+        mondays, totals = self.weekly_totals()
+        return self.daily_data[lo:hi], float(totals[(start - int(mondays[0])) // 7])
@@ -1,344 +1,506 @@
-from flask import Flask, render_template, request, redirect, url_for, jsonify, send_from_directory
-import sqlite3
-from datetime import datetime, timedelta, date
-from collections import defaultdict
+from flask import Flask, Response, render_template, request, jsonify, send_from_directory
+from datetime import date, datetime
+from jinja2 import ChoiceLoader, FileSystemLoader, PrefixLoader
+import io
 import os
+import threading
+
+import habits
+import heatmap
+import events
+import export
+import importer
+import profiling
+from cache import ResponseCache
+from db import ConnectionPool
 
 app = Flask(__name__)
-DATABASE = 'studying.db'
-WEEKLY_GOAL = 28  # Updated to 28 hours per week
-
-def get_current_week_range():
-    today = datetime.combine(date.today(), datetime.min.time())
-    start_of_week = today - timedelta(days=today.weekday())
-    end_of_week = start_of_week + timedelta(days=6)
-    return start_of_week.strftime('%Y-%m-%d'), end_of_week.strftime('%Y-%m-%d')
-
-def get_last_week_range():
-    today = datetime.combine(date.today(), datetime.min.time())
-    start_of_week = today - timedelta(days=today.weekday())
-    last_week_start = start_of_week - timedelta(days=7)
-    last_week_end = start_of_week - timedelta(days=1)
-    return last_week_start.strftime('%Y-%m-%d'), last_week_end.strftime('%Y-%m-%d')
+# Each habit's pages render as '<habit>/<template>' from its own templates folder
+app.jinja_loader = ChoiceLoader([
+    app.jinja_loader,
+    PrefixLoader({habit.name: FileSystemLoader(habit.templates) for habit in habits.HABITS})
+])
+
+# One pool for every habit: each habit's database is attached under the habit's name
+pool = ConnectionPool(':memory:', {habit.name: habit.database for habit in habits.HABITS})
+pool.init_app(app)
+
+def data_version():
+    """Every habit's highest session id, the ResponseCache version."""
+    return tuple(habits.watermarks(pool.get_db().cursor(), habits.HABITS).values())
+
+# asgi.py hands its workers one token, so their ETags agree
+response_cache = ResponseCache(data_version, token=os.environ.get('HABITS_CACHE_TOKEN'))
+live = events.LiveUpdates(pool, habits.HABITS)
 
 # ========== Database Initialization ==========
 def init_db():
-    with sqlite3.connect(DATABASE) as conn:
-        c = conn.cursor()
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS study_sessions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date TEXT,
-                time TEXT,
-                hours REAL,
-                topic TEXT,
-                location TEXT
-            )
-        ''')
-        conn.commit()
-
-def calculate_moving_average(data, window=7):
-    """Calculate moving average for a list of (date, value) tuples."""
-    if not data:
-        return []
-    
-    # Convert to list of tuples for easier processing
-    data_list = [(d['date'], d['hours']) for d in data]
-    result = []
-    
-    for i in range(len(data_list)):
-        start_idx = max(0, i - window + 1)
-        window_data = data_list[start_idx:i + 1]
-        avg = sum(hours for _, hours in window_data) / len(window_data)
-        result.append({'date': data_list[i][0], 'hours': round(avg, 2)})
-    
-    return result
-
-def calculate_streaks(daily_data):
-    # Convert to dict with date as key and hours as value
-    MIN_HOURS_PER_DAY = 4  # Minimum hours required to count as a study day
-    studied_dates = {
-        entry['date']: entry['hours'] 
-        for entry in daily_data 
-        if entry['hours'] >= MIN_HOURS_PER_DAY
-    }
+    with pool.connect() as conn:
+        for habit in habits.HABITS:
+            habits.init_db(conn, habit)
 
-    today = datetime.today().date()
-    current_streak = 0
-    longest_streak = 0
-    streak = 0
-
-    # Calculate current streak
-    day = today
-    while True:
-        date_str = day.strftime("%Y-%m-%d")
-        if date_str in studied_dates:
-            streak += 1
-            day -= timedelta(days=1)
-        else:
-            if day == today:
-                day -= timedelta(days=1)  # ignore today if not studied
-                continue
-            break
-
-    current_streak = streak
-
-    # Calculate longest streak
-    streak = 0
-    previous_day = None
-    for d in sorted(studied_dates.keys()):
-        current_day = datetime.strptime(d, "%Y-%m-%d").date()
-        if previous_day is None or current_day == previous_day + timedelta(days=1):
-            streak += 1
-        else:
-            longest_streak = max(longest_streak, streak)
-            streak = 1
-        previous_day = current_day
-    longest_streak = max(longest_streak, streak)
-
-    return {
-        'current': current_streak,
-        'longest': longest_streak,
-        'minimumHours': MIN_HOURS_PER_DAY
-    }
+def habit_not_found(name):
+    return jsonify({'error': 'Not found', 'message': f"unknown habit {name!r}"}), 404
+
+def parse_date_range():
+    """?from=&to= as 'YYYY-MM-DD' strings (None when left out).
+
+    Raises ValueError if either isn't a date or from is after to.
+    """
+    try:
+        # Normalized, since the dates are compared as strings
+        start, end = (date.fromisoformat(request.args[arg]).isoformat() if request.args.get(arg) else None
+                      for arg in ('from', 'to'))
+    except ValueError:
+        raise ValueError('from and to must be YYYY-MM-DD')
+    if start and end and start > end:
+        raise ValueError('from must not be after to')
+    return start, end
 
 # ========== API Routes ==========
-@app.route('/api/study-data')
-def get_study_data():
-    with sqlite3.connect(DATABASE) as conn:
+@app.route('/api/habits')
+def list_habits():
+    return jsonify({
+        'habits': [{
+            'name': habit.name,
+            'label': habit.label,
+            'valueKey': habit.value_key,
+            'categoryKey': habit.category_key,
+            'weeklyGoal': habit.weekly_goal
+        } for habit in habits.HABITS]
+    })
+
+@app.route('/api/overview')
+@profiling.profiled
+@response_cache.cached
+def overview():
+    """Every habit's weekly comparison, goal progress and streaks in one response.
+
+    All the daily rollups are read in one statement over the attached
+    databases; the Server-Timing header has that query's time and then each
+    habit's.
+    """
+    timer = profiling.current_timer()
+    with pool.get_db() as conn, timer.tracing(conn):
+        response_data = {'habits': habits.build_overview(conn.cursor(), habits.HABITS, timer)}
+
+    if timer.enabled:
+        response_data['_timings'] = timer.report()
+    return jsonify(response_data)
+
+@app.route('/api/habits/<name>/data')
+@profiling.profiled
+@response_cache.cached
+def habit_data(name):
+    """A habit's dashboard; ?fields=streaks,goalProgress builds only those sections.
+
+    ?from=&to=&granularity=week limit the charted series (dailyData and the
+    moving averages) to those dates, summed per day, week, month or year.
+    ?topic=math,ml&location=library (the habit's category and location)
+    limit every section to those sessions.
+    """
+    habit = habits.REGISTRY.get(name)
+    if habit is None:
+        return habit_not_found(name)
+    fill_gaps = request.args.get('fillGaps') == '1'
+    try:
+        windows = habits.parse_windows(request.args['windows']) if request.args.get('windows') else None
+        fields = habits.parse_fields(habit, request.args.get('fields'))
+        start, end = parse_date_range()
+        daily_range = habits.DailyRange(start, end, request.args.get('granularity') or 'day', fill_gaps)
+    except ValueError as e:
+        return jsonify({'error': 'Bad request', 'message': str(e)}), 400
+    filters = habits.parse_filters(habit, request.args)
+    timer = profiling.current_timer()
+
+    with pool.get_db() as conn, timer.tracing(conn):
+        response_data = habits.build_dashboard(conn.cursor(), habit, windows, fill_gaps, timer, fields, daily_range,
+                                               filters)
+
+    if timer.enabled:
+        response_data['_timings'] = timer.report()
+    return jsonify(response_data)
+
+@app.route('/api/habits/<name>/series')
+@profiling.profiled
+@response_cache.cached
+def habit_series(name):
+    """Totals per ?granularity=week|month|year (default month), from the maintained rollups.
+
+    ?from=&to= pick the periods; without them the series covers all time.
+    Category and location filters (e.g. ?topic=math,ml) sum only those sessions.
+    """
+    habit = habits.REGISTRY.get(name)
+    if habit is None:
+        return habit_not_found(name)
+    try:
+        start, end = parse_date_range()
+        daily_range = habits.DailyRange(start, end, request.args.get('granularity') or 'month')
+    except ValueError as e:
+        return jsonify({'error': 'Bad request', 'message': str(e)}), 400
+    filters = habits.parse_filters(habit, request.args)
+
+    timer = profiling.current_timer()
+    with pool.get_db() as conn, timer.tracing(conn):
+        series = habits.get_series(conn.cursor(), habit, daily_range, filters)
+    timer.lap('series')
+    response_data = {
+        'granularity': daily_range.granularity,
+        'series': series
+    }
+    if timer.enabled:
+        response_data['_timings'] = timer.report()
+    return jsonify(response_data)
+
+@app.route('/api/habits/<name>/calendar')
+@profiling.profiled
+@response_cache.cached
+def habit_calendar(name):
+    """Heatmap cells for ?year= or ?from=&to= (default: this year).
+
+    ?format=columnar sends parallel arrays instead, with each day's category
+    ids and one legend mapping the ids to names.
+    """
+    habit = habits.REGISTRY.get(name)
+    if habit is None:
+        return habit_not_found(name)
+    today = datetime.now().date()
+    try:
+        start, end = heatmap.parse_range(request.args, today)
+    except ValueError as e:
+        return jsonify({'error': 'Bad request', 'message': str(e)}), 400
+    filters = habits.parse_filters(habit, request.args)
+    columnar = request.args.get('format') == 'columnar'
+    timer = profiling.current_timer()
+    with pool.get_db() as conn, timer.tracing(conn):
         c = conn.cursor()
-        
-        # Get current and last week ranges
-        current_week_start, current_week_end = get_current_week_range()
-        last_week_start, last_week_end = get_last_week_range()
-        
-        # Daily Data
-        c.execute('''
-            SELECT date, SUM(hours) as total_hours
-            FROM study_sessions
-            GROUP BY date
-            ORDER BY date
-        ''')
-        daily_data = [{'date': row[0], 'hours': row[1]} for row in c.fetchall()]
-        
-        # Calculate streaks
-        streaks = calculate_streaks(daily_data)
-        
-        # Calculate moving average
-        moving_avg_data = calculate_moving_average(daily_data)
-        
-        # Current Week Total with daily breakdown
-        c.execute('''
-            SELECT date, SUM(hours) as total_hours
-            FROM study_sessions
-            WHERE date BETWEEN ? AND ?
-            GROUP BY date
-            ORDER BY date
-        ''', (current_week_start, current_week_end))
-        current_week_daily = [{'date': row[0], 'hours': row[1]} for row in c.fetchall()]
-        current_week_hours = sum(day['hours'] for day in current_week_daily)
-        
-        # Calculate days remaining in the week
-        today = datetime.now().date()
-        days_elapsed = (today - datetime.strptime(current_week_start, '%Y-%m-%d').date()).days + 1
-        days_remaining = 7 - days_elapsed
-        
-        # Calculate average hours needed per remaining day
-        hours_remaining = WEEKLY_GOAL - current_week_hours
-        avg_hours_needed = hours_remaining / days_remaining if days_remaining > 0 else 0
-        
-        # Last Week Total
-        c.execute('''
-            SELECT SUM(hours) as total_hours
-            FROM study_sessions
-            WHERE date BETWEEN ? AND ?
-        ''', (last_week_start, last_week_end))
-        last_week_hours = c.fetchone()[0] or 0
-        
-        # Calculate weekly change
-        weekly_change = ((current_week_hours - last_week_hours) / last_week_hours * 100) if last_week_hours > 0 else 0
-        
-        # Topic Balance - Last 30 days
-        thirty_days_ago = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
-        c.execute('''
-            SELECT topic, SUM(hours) as total_hours
-            FROM study_sessions
-            WHERE date >= ?
-            GROUP BY topic
-            ORDER BY total_hours DESC
-        ''', (thirty_days_ago,))
-        topic_data = [{'topic': row[0], 'hours': row[1]} for row in c.fetchall()]
-        
-        # Calculate total hours for percentage
-        total_hours = sum(t['hours'] for t in topic_data)
-        topic_balance = [{
-            'topic': t['topic'],
-            'hours': t['hours'],
-            'percentage': round((t['hours'] / total_hours * 100), 1) if total_hours else 0
-        } for t in topic_data]
-        
-        # Most Productive Hours
-        c.execute('''
-            SELECT substr(time, 1, 2) as hour,
-                   SUM(hours) as total_hours
-            FROM study_sessions
-            GROUP BY hour
-            ORDER BY hour
-        ''')
-        hourly_data = [{'hour': int(row[0]), 'hours': row[1]} for row in c.fetchall()]
-        
+        calendar_data = habits.get_calendar_data(c, habit, start, end, today, filters, ids=columnar)
+        legend = habits.calendar_legend(c, habit, calendar_data) if columnar else None
+    timer.lap('calendar')
+    if columnar:
         response_data = {
-            'dailyData': daily_data,
-            'movingAvgData': moving_avg_data,
-            'weeklyComparison': {
-                'current': round(current_week_hours, 1),
-                'last': round(last_week_hours, 1),
-                'change': round(weekly_change, 1)
-            },
-            'topicBalance': topic_balance,
-            'hourlyData': hourly_data,
-            'goalProgress': {
-                'current': round(current_week_hours, 1),
-                'goal': WEEKLY_GOAL,
-                'percentage': min(round((current_week_hours / WEEKLY_GOAL * 100), 1), 100),
-                'daysElapsed': days_elapsed,
-                'daysRemaining': days_remaining,
-                'hoursRemaining': round(hours_remaining, 1),
-                'avgHoursNeeded': round(avg_hours_needed, 1),
-                'dailyBreakdown': current_week_daily
-            },
-            'streaks': streaks
+            'calendarColumns': heatmap.to_columns(calendar_data, habit.value_key, habit.calendar_key),
+            'legend': legend,
+            'today': today.isoformat()
         }
-        
-        return jsonify(response_data)
+    else:
+        response_data = {
+            'calendarData': calendar_data
+        }
+    if timer.enabled:
+        response_data['_timings'] = timer.report()
+    return jsonify(response_data)
 
-@app.route('/api/study-sessions', methods=['POST'])
-def add_study_session():
-    data = request.json
-    with sqlite3.connect(DATABASE) as conn:
-        c = conn.cursor()
-        c.execute('''
-            INSERT INTO study_sessions (date, time, hours, topic, location)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (data['date'], data['time'], data['hours'], data['topic'], data['location']))
-        conn.commit()
-    return jsonify({'message': 'Study session added successfully'})
-
-@app.route('/api/debug-today')
-def debug_today():
+@app.route('/api/habits/<name>/hourly')
+@profiling.profiled
+@response_cache.cached
+def habit_hourly(name):
+    """Totals per hour and per weekday and hour, from the maintained histograms.
+
+    ?from=&to= (YYYY-MM-DD, either may be left out) and the habit's category
+    and location (e.g. ?topic=math,ml&location=library) restrict it to
+    matching sessions.
+    """
+    habit = habits.REGISTRY.get(name)
+    if habit is None:
+        return habit_not_found(name)
+    if not habit.has_time:
+        return jsonify({'error': 'Not found', 'message': f"habit {name!r} has no time column"}), 404
+    try:
+        start, end = parse_date_range()
+    except ValueError as e:
+        return jsonify({'error': 'Bad request', 'message': str(e)}), 400
+    filters = habits.parse_filters(habit, request.args)
+
+    timer = profiling.current_timer()
+    with pool.get_db() as conn, timer.tracing(conn):
+        hourly_data, weekday_hourly = habits.get_hourly_data(conn.cursor(), habit, start, end, filters)
+    timer.lap('hourly')
+    response_data = {
+        'hourlyData': hourly_data,
+        'weekdayHourly': weekday_hourly
+    }
+    if timer.enabled:
+        response_data['_timings'] = timer.report()
+    return jsonify(response_data)
+
+@app.route('/api/habits/<name>/sessions', methods=['POST'])
+def add_session(name):
+    habit = habits.REGISTRY.get(name)
+    if habit is None:
+        return habit_not_found(name)
+    try:
+        row = habits.parse_session(habit, request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'error': 'Bad request', 'message': str(e)}), 400
+    with pool.get_db() as conn:
+        habits.insert_sessions(conn, habit, [row])
+    response_cache.bump()
+    live.notify()
+    return jsonify({'message': f'{habit.label} added successfully', 'success': True})
+
+# ========== Bulk Ingestion ==========
+BULK_CHUNK_SIZE = 20000  # rows per transaction
+MAX_REPORTED_ERRORS = 100
+
+def read_bulk_records():
+    """Records from a JSON array body, or from a CSV or NDJSON body one line at a time.
+
+    Yields (index, record, error): index is the array position, the 0-based
+    NDJSON line or the CSV row after the header, and error is set instead of
+    record for lines that don't parse. Raises ValueError if a JSON body
+    isn't an array.
+    """
+    if request.mimetype == 'application/json':
+        records = request.get_json(silent=True)
+        if not isinstance(records, list):
+            raise ValueError('body must be a JSON array of sessions')
+        return ((i, record, None) for i, record in enumerate(records))
+
+    # The raw WSGI stream reads lines a byte at a time; buffer it
+    stream = io.BufferedReader(request.stream, 1 << 16)
+    if request.mimetype == 'text/csv':
+        return importer.csv_records(io.TextIOWrapper(stream, encoding=request.mimetype_params.get('charset', 'utf-8'),
+                                                     newline=''))
+    return importer.ndjson_records(stream)
+
+@app.route('/api/habits/<name>/sessions/bulk', methods=['POST'])
+def add_sessions_bulk(name):
+    """Insert many rows from a JSON array, or CSV or NDJSON (one row per line).
+
+    Valid rows are inserted in chunks of BULK_CHUNK_SIZE, each chunk in its own
+    transaction; invalid rows are skipped and reported by index.
+    """
+    habit = habits.REGISTRY.get(name)
+    if habit is None:
+        return habit_not_found(name)
+    try:
+        records = read_bulk_records()
+    except ValueError as e:
+        return jsonify({'error': 'Bad request', 'message': str(e)}), 400
+    if request.mimetype == 'text/csv':
+        # Every CSV field is text: make the value a number, as the importer does
+        records = ((index, importer.prepare(habit, record), error) for index, record, error in records)
+
+    inserted = rejected = 0
+    errors = []
+    chunk = []
+    try:
+        with pool.get_db() as conn:
+            for index, record, error in records:
+                if error is None:
+                    try:
+                        chunk.append(habits.parse_session(habit, record))
+                    except ValueError as e:
+                        error = str(e)
+                if error is not None:
+                    rejected += 1
+                    if len(errors) < MAX_REPORTED_ERRORS:
+                        errors.append({'row': index, 'error': error})
+                if len(chunk) >= BULK_CHUNK_SIZE:
+                    habits.insert_sessions(conn, habit, chunk)
+                    inserted += len(chunk)
+                    chunk = []
+            if chunk:
+                habits.insert_sessions(conn, habit, chunk)
+                inserted += len(chunk)
+    finally:
+        # Chunks already committed stay in even if a later one fails
+        if inserted:
+            response_cache.bump()
+            live.notify()
+
+    return jsonify({
+        'inserted': inserted,
+        'rejected': rejected,
+        'errors': errors
+    })
+
+@app.route('/api/habits/<name>/import', methods=['POST'])
+def import_sessions(name):
+    """Import a CSV (text/csv), NDJSON or JSON array body, skipping rows already stored.
+
+    ?map=Subject:topic,Duration:hours renames source columns; ?deferIndexes=1
+    rebuilds the table's indexes once after the load instead of row by row.
+    The import is a single transaction.
+    """
+    habit = habits.REGISTRY.get(name)
+    if habit is None:
+        return habit_not_found(name)
+    try:
+        mapping = importer.parse_mapping(request.args.get('map'))
+        records = read_bulk_records()
+    except ValueError as e:
+        return jsonify({'error': 'Bad request', 'message': str(e)}), 400
+
+    with pool.get_db() as conn:
+        result = importer.import_records(conn, habit, records, mapping,
+                                         defer_indexes=request.args.get('deferIndexes') == '1')
+    if result['inserted']:
+        response_cache.bump()
+        live.notify()
+    return jsonify(result)
+
+@app.route('/api/habits/<name>/debug-today')
+def debug_today(name):
+    habit = habits.REGISTRY.get(name)
+    if habit is None:
+        return habit_not_found(name)
     today = datetime.now().strftime('%Y-%m-%d')
-    with sqlite3.connect(DATABASE) as conn:
+    columns = ('id',) + habit.columns
+    with pool.get_db() as conn:
         c = conn.cursor()
-        c.execute('SELECT * FROM study_sessions WHERE date = ?', (today,))
+        c.execute(f'SELECT id, {", ".join(habits.named_columns(habit))} FROM {habit.sessions} WHERE date = ?',
+                  (today,))
         rows = c.fetchall()
         return jsonify({
             'today': today,
-            'sessions': [{
-                'id': row[0],
-                'date': row[1],
-                'time': row[2],
-                'hours': row[3],
-                'topic': row[4],
-                'location': row[5]
-            } for row in rows]
+            'sessions': [dict(zip(columns, row)) for row in rows]
         })
 
+# ========== Export ==========
+@app.route('/api/export')
+def export_data():
+    """Stream a habit's rows as a file download.
+
+    ?habit= is required. ?kind=sessions (default) exports the raw rows,
+    ?kind=daily the daily rollup; ?from=&to= bound the dates, category and
+    location filters (e.g. ?topic=math) pick sessions, and ?format=
+    is csv (default), ndjson or parquet. Rows are fetched in batches while
+    the response is sent, so the export never holds the table in memory.
+    """
+    habit = habits.REGISTRY.get(request.args.get('habit', ''))
+    if habit is None:
+        return jsonify({'error': 'Bad request',
+                        'message': f"habit must be one of {', '.join(habits.REGISTRY)}"}), 400
+    kind = request.args.get('kind', 'sessions')
+    if kind not in export.KINDS:
+        return jsonify({'error': 'Bad request', 'message': f"kind must be one of {', '.join(export.KINDS)}"}), 400
+    fmt = request.args.get('format', 'csv')
+    if fmt not in export.FORMATS:
+        return jsonify({'error': 'Bad request', 'message': f"format must be one of {', '.join(export.FORMATS)}"}), 400
+    if fmt == 'parquet' and not export.PARQUET_ENABLED:
+        return jsonify({'error': 'Not implemented', 'message': 'parquet export needs pyarrow installed'}), 501
+    try:
+        start, end = parse_date_range()
+    except ValueError as e:
+        return jsonify({'error': 'Bad request', 'message': str(e)}), 400
+    filters = habits.parse_filters(habit, request.args)
+
+    names = export.columns(habit, kind)
+
+    def generate():
+        # A connection of its own: the stream outlives the request's app context
+        conn = pool.acquire()
+        cursor = conn.cursor()
+        try:
+            export.rows(cursor, habit, kind, start, end, filters)
+            if fmt == 'csv':
+                yield from export.csv_chunks(cursor, names)
+            elif fmt == 'ndjson':
+                yield from export.ndjson_chunks(cursor, names)
+            else:
+                yield from export.parquet_chunks(cursor, names, export.parquet_schema(habit, kind))
+        finally:
+            cursor.close()  # ends the read if the client went away mid-stream
+            pool.release(conn)
+
+    filename = '-'.join(part for part in (habit.name, kind, start, end) if part) + f'.{fmt}'
+    return Response(generate(), mimetype=export.FORMATS[fmt],
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+# ========== Live Updates ==========
+@app.route('/api/stream')
+def stream():
+    """Server-sent events with each change to the habits in ?habits= (default all).
+
+    'update' events carry habits.build_update deltas; 'resync' means refetch.
+    asgi.py serves this route itself, without tying up a request thread.
+    """
+    try:
+        names = events.parse_habits(request.args.get('habits'))
+    except ValueError as e:
+        return jsonify({'error': 'Bad request', 'message': str(e)}), 400
+
+    def generate():
+        # Subscribed here rather than in the view: a stream that never starts never ends either
+        wake = threading.Event()
+        subscription = live.subscribe(names, wake.set)
+        try:
+            yield events.RETRY
+            while True:
+                if wake.wait(events.KEEPALIVE_SECONDS):
+                    wake.clear()
+                    messages = subscription.drain()
+                    if messages:
+                        yield messages
+                else:
+                    yield events.KEEPALIVE  # also how a closed connection is noticed
+        finally:
+            live.unsubscribe(subscription)
+
+    return Response(generate(), mimetype='text/event-stream', headers=events.HEADERS)
+
+@app.route('/api/debug-pool')
+def debug_pool():
+    return jsonify(pool.statistics())
+
+@app.route('/api/debug/profile')
+def debug_profile():
+    """Reports of the last ?n= (default all kept) data, calendar and overview requests."""
+    if not profiling.enabled():
+        return jsonify({'error': 'Not found', 'message': 'profiling is off; set HABITS_PROFILING=1'}), 404
+    try:
+        n = int(request.args.get('n', profiling.PROFILE_HISTORY))
+    except ValueError:
+        return jsonify({'error': 'Bad request', 'message': 'n must be an integer'}), 400
+    return jsonify({'profiles': profiling.recent_profiles(max(n, 0))})
+
 # ========== Main Routes ==========
 @app.route('/')
 def index():
-    return render_template('index.html')
+    return render_template('index.html', calendar_year=date.today().year)
 
-# New Calendar Implementation
-def get_calendar_data():
-    """Generate calendar data for the heatmap visualization for the year 2025 only."""
-    calendar_data = []
-    today = datetime.now().date()
-    
-    # Calculate proper start date to align with Monday
-    first_day_of_year = datetime(2025, 1, 1).date()
-    # Go back to the Monday of the week containing Jan 1st
-    start_date = first_day_of_year - timedelta(days=first_day_of_year.weekday())
-    # Calculate end date to ensure we have complete weeks
-    end_date = datetime(2025, 12, 31).date()
-    last_weekday = end_date.weekday()
-    if last_weekday < 6:  # If not Sunday, extend to end of week
-        end_date = end_date + timedelta(days=6-last_weekday)
-    
-    with sqlite3.connect(DATABASE) as conn:
-        c = conn.cursor()
-        c.execute('''
-            SELECT date, SUM(hours) as total_hours,
-                   GROUP_CONCAT(DISTINCT topic) as topics
-            FROM study_sessions
-            WHERE date BETWEEN ? AND ?
-            GROUP BY date
-        ''', (start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')))
-        
-        study_data = {}
-        for row in c.fetchall():
-            date_str = row[0]
-            study_data[date_str] = {
-                'hours': row[1],
-                'topics': row[2].split(',') if row[2] else []
-            }
-    
-    # Generate calendar data
-    current_date = start_date
-    week_number = 1
-    
-    while current_date <= end_date:
-        date_str = current_date.strftime('%Y-%m-%d')
-        is_future = current_date > today
-        
-        # Calculate grid position
-        if current_date.weekday() == 0:  # If it's Monday
-            week_number += 1
-        
-        # Only include days from 2025 in the calendar data
-        if current_date.year == 2025:
-            day_data = study_data.get(date_str, {'hours': 0, 'topics': []})
-            
-            if is_future:
-                intensity = 0
-            else:
-                hours = day_data['hours']
-                if hours == 0:
-                    intensity = 0
-                elif hours < 2:
-                    intensity = 1
-                elif hours < 4:
-                    intensity = 2
-                elif hours < 6:
-                    intensity = 3
-                else:
-                    intensity = 4
-            
-            calendar_data.append({
-                'date': date_str,
-                'day': current_date.day,
-                'month': current_date.month,
-                'year': current_date.year,
-                'weekday': current_date.weekday(),  # 0 = Monday, 6 = Sunday
-                'week': week_number,
-                'gridColumn': week_number,
-                'hours': day_data['hours'],
-                'intensity': intensity,
-                'topics': day_data['topics'],
-                'isToday': current_date == today,
-                'isWeekend': current_date.weekday() >= 5,
-                'isFuture': is_future
-            })
-        
-        current_date += timedelta(days=1)
-    
-    return calendar_data
-
-@app.route('/api/calendar-data')
-def get_calendar():
-    return jsonify({
-        'calendarData': get_calendar_data()
-    })
+@app.route('/habits/<name>')
+def habit_page(name):
+    if name not in habits.REGISTRY:
+        return habit_not_found(name)
+    # The calendar shows this year, as its route does by default
+    return render_template(f'{name}/index.html', calendar_year=date.today().year)
+
+@app.route('/favicon.ico')
+def favicon():
+    return send_from_directory(os.path.join(app.root_path, 'budget', 'static'),
+                               'favicon.ico', mimetype='image/vnd.microsoft.icon')
+
+# ========== Legacy URLs ==========
+# Routes of the old one-app-per-habit setup, kept as aliases of the generic
+# ones. /api/calendar-data and /api/debug-today existed in every app; here
+# they stay the study habit's. /api/study-data/series sits next to its data route.
+LEGACY_ROUTES = [
+    ('/api/study-data', 'habit_data', 'study', ['GET']),
+    ('/api/study-data/series', 'habit_series', 'study', ['GET']),
+    ('/api/sleep-data', 'habit_data', 'sleep', ['GET']),
+    ('/api/sports-data', 'habit_data', 'sports', ['GET']),
+    ('/api/budget-data', 'habit_data', 'budget', ['GET']),
+    ('/api/calendar-data', 'habit_calendar', 'study', ['GET']),
+    ('/api/study-sessions', 'add_session', 'study', ['POST']),
+    ('/api/study-sessions/bulk', 'add_sessions_bulk', 'study', ['POST']),
+    ('/api/sleep-sessions', 'add_session', 'sleep', ['POST']),
+    ('/api/sports-sessions', 'add_session', 'sports', ['POST']),
+    ('/api/budget-entries', 'add_session', 'budget', ['POST']),
+    ('/api/debug-today', 'debug_today', 'study', ['GET']),
+    # The sleep app rendered sleeping.html here, which needs chart data that
+    # route never passed (it was a 500); this is the sleep dashboard instead
+    ('/sleeping', 'habit_page', 'sleep', ['GET']),
+    ('/sports', 'habit_page', 'sports', ['GET']),
+    ('/budget', 'habit_page', 'budget', ['GET']),
+]
+# Serve /api/habits/study/data as is instead of redirecting it to its alias
+app.url_map.redirect_defaults = False
+for rule, endpoint, name, methods in LEGACY_ROUTES:
+    app.add_url_rule(rule, endpoint, defaults={'name': name}, methods=methods)
 
 if __name__ == '__main__':
     init_db()
-    app.run(debug=True) 
+    app.run(debug=True)
@@ -0,0 +1,130 @@
+"""Production entry point: the same Flask app served by uvicorn.
+
+`python app.py` is Flask's debug server, with the reloader and debugger on.
+This serves the app over ASGI instead. Each uvicorn worker is a process with
+its own event loop, and the Flask views, which block on SQLite, run in a
+bounded pool of THREADS threads per worker, so a slow dashboard only ties up
+its own thread while the loop keeps accepting and answering other clients.
+Requests beyond the pool's size wait for a free thread instead of piling up
+threads and connections. /api/stream is the exception: it is served here on
+the event loop, since each open dashboard holds its stream for as long as
+the tab is open and would otherwise keep one of those threads.
+
+    pip install uvicorn a2wsgi
+    python asgi.py --workers 4 --threads 16
+    HABITS_THREADS=16 uvicorn asgi:application --workers 4   # after one python asgi.py run
+
+Run it through asgi.py at least once per deploy: it applies the database
+migrations once, before the workers start, instead of having every worker
+race to apply them. It also gives every worker the same HABITS_CACHE_TOKEN,
+so a client's ETag is honoured by whichever worker answers; set it yourself
+when starting uvicorn directly. The cached responses follow the databases'
+session ids, so a write through any worker, or by importer.py, is seen by all.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from urllib.parse import parse_qs
+
+import uvicorn
+from a2wsgi import WSGIMiddleware
+
+import app
+import events
+import habits
+
+THREADS = int(os.environ.get('HABITS_THREADS', 16))
+WORKERS = int(os.environ.get('HABITS_WORKERS', os.cpu_count() or 1))
+# Optional directory holding every habit's database file, e.g. seed_synthetic --out
+DATA_DIR = os.environ.get('HABITS_DATA_DIR')
+
+def use_data_dir(path):
+    """Point every habit at <path>/<its database file name>, before any request."""
+    for habit in habits.HABITS:
+        habit.database = os.path.join(path, os.path.basename(habit.database))
+    app.pool.attached = {habit.name: habit.database for habit in habits.HABITS}
+
+if DATA_DIR:
+    use_data_dir(DATA_DIR)
+# One idle connection per thread, so a busy worker never reopens them
+app.pool.resize(THREADS)
+
+wsgi = WSGIMiddleware(app.app, workers=THREADS)
+
+async def until_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+async def stream(scope, receive, send):
+    """app.stream() as a coroutine: pushes the same messages without holding a thread."""
+    query = parse_qs(scope['query_string'].decode('latin-1'))
+    try:
+        names = events.parse_habits(query.get('habits', [''])[0])
+    except ValueError as e:
+        await send({'type': 'http.response.start', 'status': 400,
+                    'headers': [(b'content-type', b'application/json')]})
+        await send({'type': 'http.response.body',
+                    'body': json.dumps({'error': 'Bad request', 'message': str(e)}).encode()})
+        return
+
+    loop = asyncio.get_running_loop()
+    wake = asyncio.Event()
+    subscription = app.live.subscribe(names, lambda: loop.call_soon_threadsafe(wake.set))
+    disconnected = loop.create_task(until_disconnect(receive))
+    try:
+        headers = [(b'content-type', b'text/event-stream; charset=utf-8')]
+        headers += [(name.lower().encode(), value.encode()) for name, value in events.HEADERS.items()]
+        await send({'type': 'http.response.start', 'status': 200, 'headers': headers})
+        messages = events.RETRY
+        while True:
+            await send({'type': 'http.response.body', 'body': messages.encode(), 'more_body': True})
+            messages = ''
+            while not messages:
+                woken = loop.create_task(wake.wait())
+                done, _ = await asyncio.wait({woken, disconnected}, timeout=events.KEEPALIVE_SECONDS,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                woken.cancel()
+                if disconnected in done:
+                    return
+                if woken in done:
+                    wake.clear()
+                    messages = subscription.drain()
+                else:
+                    messages = events.KEEPALIVE
+    finally:
+        app.live.unsubscribe(subscription)
+        disconnected.cancel()
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and scope['path'] == '/api/stream' and scope['method'] == 'GET':
+        await stream(scope, receive, send)
+    else:
+        await wsgi(scope, receive, send)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default=os.environ.get('HABITS_HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('HABITS_PORT', 8000)))
+    parser.add_argument('--workers', type=int, default=WORKERS, help='processes (default: one per CPU)')
+    parser.add_argument('--threads', type=int, default=THREADS, help='request threads per worker')
+    parser.add_argument('--data', default=DATA_DIR, help="directory with the habits' database files")
+    args = parser.parse_args()
+
+    # The workers import this module afresh and read the settings from here
+    os.environ['HABITS_THREADS'] = str(args.threads)
+    # One ETag token per deploy, shared by every worker (see cache.ResponseCache)
+    os.environ.setdefault('HABITS_CACHE_TOKEN', format(int(time.time()), 'x'))
+    if args.data:
+        os.environ['HABITS_DATA_DIR'] = os.path.abspath(args.data)
+    if args.data != DATA_DIR:
+        use_data_dir(args.data)
+    app.init_db()
+    app.pool.close_all()
+
+    uvicorn.run('asgi:application', host=args.host, port=args.port, workers=args.workers,
+                app_dir=os.path.dirname(os.path.abspath(__file__)))
+
+if __name__ == '__main__':
+    main()
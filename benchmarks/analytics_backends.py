@@ -0,0 +1,102 @@
+"""Pure-Python vs NumPy analytics for /api/study-data at 10k, 100k and 1M sessions.
+
+For each size, seeds a throwaway study database, then times
+  * the derived sections alone (streaks, 7/30/90-day averages, weekly totals)
+  * the whole route through Flask's test client
+with analytics.ENABLED off and on, and checks both produce the same JSON.
+
+    python benchmarks/analytics_backends.py --sizes 10000,100000,1000000
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import analytics  # noqa: E402
+import app  # noqa: E402
+import habits  # noqa: E402
+from query_plans import build_database  # noqa: E402
+
+WINDOWS = (7, 30, 90)
+STUDY = habits.REGISTRY['study']
+
+def median_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+def python_sections(daily_data, week_start, last_week_start):
+    habits.calculate_streaks(STUDY, daily_data)
+    habits.calculate_moving_averages(daily_data, WINDOWS, True)
+    week_end = habits.get_current_week_range()[1]
+    [d for d in daily_data if week_start <= d['date'] <= week_end]
+    sum(d['hours'] for d in daily_data if last_week_start <= d['date'] < week_start)
+
+def numpy_sections(daily_data, week_start, last_week_start):
+    series = analytics.DailySeries(daily_data)
+    habits.calculate_streaks(STUDY, daily_data, series)
+    series.moving_averages(WINDOWS, True)
+    series.week(week_start)
+    series.week(last_week_start)
+
+def run_size(sessions, sessions_per_day, repeat):
+    days = max(1, int(sessions / sessions_per_day))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        build_database(path, sessions, days)
+        # Attach only the throwaway database, never the real habit files
+        STUDY.database = path
+        app.pool.attached = {'study': path}
+        with app.pool.connect() as conn:
+            habits.init_db(conn, STUDY)
+            rows = conn.execute('SELECT date, hours FROM study.daily_totals ORDER BY date').fetchall()
+        daily_data = [{'date': row[0], 'hours': row[1]} for row in rows]
+        week_start, _ = habits.get_current_week_range()
+        last_week_start, _ = habits.get_last_week_range()
+
+        def route():
+            # Time the real work, not the response cache
+            app.response_cache.bump()
+            return client.get(url)
+
+        client = app.app.test_client()
+        url = '/api/study-data?windows=7,30,90&fillGaps=1'
+        results = {'sessions': sessions, 'days': len(daily_data)}
+        bodies = {}
+        for name, enabled, sections in (('python', False, python_sections), ('numpy', True, numpy_sections)):
+            analytics.ENABLED = enabled
+            results[f'{name} sections'] = median_ms(lambda: sections(daily_data, week_start, last_week_start), repeat)
+            results[f'{name} route'] = median_ms(route, repeat)
+            bodies[name] = route().get_data()
+        app.pool.close_all()
+        results['identical'] = bodies['python'] == bodies['numpy']
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='10000,100000,1000000')
+    parser.add_argument('--sessions-per-day', type=float, default=2.0)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    if analytics.np is None:
+        sys.exit('NumPy is not installed; nothing to compare against.')
+
+    header = f"{'sessions':>9} {'days':>7}  {'sections py/np (ms)':>22}  {'route py/np (ms)':>22}  same"
+    print(header)
+    for size in (int(s) for s in args.sizes.split(',')):
+        r = run_size(size, args.sessions_per_day, args.repeat)
+        print(f"{r['sessions']:>9,} {r['days']:>7,}  "
+              f"{r['python sections']:>9.1f} / {r['numpy sections']:>8.1f}   "
+              f"{r['python route']:>9.1f} / {r['numpy route']:>8.1f}   {r['identical']}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+"""Concurrent dashboard clients against the dev server and asgi.py.
+
+Each server in turn is started on a throwaway copy of the data and hit by
+--clients threads for --seconds. Every client loops over the URLs a
+dashboard loads (data, calendar, hourly, overview) on one keep-alive
+connection, as a browser tab would. Prints requests per second, p50/p95
+latency and errors per server, and the ratio between them:
+
+    python benchmarks/load_test.py                          # 50 clients, 20 s each
+    python benchmarks/load_test.py --workers 4 --threads 16 --uncached
+    python benchmarks/load_test.py --data /tmp/load --servers asgi
+
+Without --data the databases are seeded with seed_synthetic.py (--years of
+data). --uncached makes every URL unique, so no response comes from the
+response cache and each request runs its queries.
+"""
+import argparse
+import http.client
+import itertools
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from suite import percentiles  # noqa: E402
+
+URLS = [
+    '/api/study-data',
+    '/api/calendar-data',
+    '/api/habits/study/hourly',
+    '/api/habits/sleep/data',
+    '/api/habits/sports/data',
+    '/api/habits/budget/data',
+    '/api/overview',
+]
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def run_dev(port, data):
+    """`python app.py`, on the databases in data (run in a child process)."""
+    import app
+    import habits
+    for habit in habits.HABITS:
+        habit.database = os.path.join(data, os.path.basename(habit.database))
+    app.pool.attached = {habit.name: habit.database for habit in habits.HABITS}
+    app.init_db()
+    app.app.run(port=port, debug=True, use_reloader=False)
+
+def start(server, port, data, workers, threads):
+    """Start a server in the background; returns a callable that stops it."""
+    if server == 'dev':
+        process = subprocess.Popen([sys.executable, '-c', f'import load_test; load_test.run_dev({port}, {data!r})'],
+                                   cwd=os.path.dirname(os.path.abspath(__file__)))
+    else:
+        process = subprocess.Popen([
+            sys.executable, os.path.join(ROOT, 'asgi.py'), '--port', str(port),
+            '--workers', str(workers), '--threads', str(threads), '--data', data])
+
+    deadline = time.monotonic() + 60
+    while True:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            conn.request('GET', '/api/habits')
+            conn.getresponse().read()
+            conn.close()
+            break
+        except OSError:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f'{server} server did not start on port {port}')
+            time.sleep(0.2)
+
+    def stop():
+        process.terminate()
+        process.wait(10)
+    return stop
+
+def load(port, clients, seconds, uncached):
+    """Run the clients for seconds; returns (latencies in s, errors, elapsed s)."""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    counter = itertools.count()
+    ready = threading.Barrier(clients + 1)
+    deadline = [0.0]
+
+    def client(offset):
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        mine, failed = [], 0
+        ready.wait()
+        for i in itertools.count(offset):
+            if time.monotonic() >= deadline[0]:
+                break
+            url = URLS[i % len(URLS)]
+            if uncached:
+                url += f"{'&' if '?' in url else '?'}_={next(counter)}"
+            started = time.perf_counter()
+            try:
+                conn.request('GET', url)
+                response = conn.getresponse()
+                response.read()
+                if response.status != 200:
+                    failed += 1
+                    continue
+                mine.append(time.perf_counter() - started)
+                if response.will_close:
+                    conn.close()  # the dev server answers in HTTP/1.0; reconnect
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                conn.close()
+        conn.close()
+        with lock:
+            latencies.extend(mine)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    deadline[0] = time.monotonic() + seconds
+    started = time.perf_counter()
+    ready.wait()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0], time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--servers', nargs='+', choices=('dev', 'asgi'), default=['dev', 'asgi'])
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--seconds', type=float, default=20)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='asgi.py worker processes')
+    parser.add_argument('--threads', type=int, default=16, help='asgi.py threads per worker')
+    parser.add_argument('--uncached', action='store_true', help='bypass the response cache')
+    parser.add_argument('--data', help='directory with the databases to copy (default: seed one)')
+    parser.add_argument('--years', type=float, default=5, help='years of data to seed without --data')
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix='habits-load-')
+    try:
+        if args.data:
+            for name in os.listdir(args.data):
+                if name.endswith('.db'):
+                    shutil.copy(os.path.join(args.data, name), tmp)
+        else:
+            subprocess.run([sys.executable, os.path.join(ROOT, 'benchmarks', 'seed_synthetic.py'),
+                            '--years', str(args.years), '--seed', '1', '--out', tmp], check=True)
+
+        results = {}
+        for server in args.servers:
+            port = free_port()
+            stop = start(server, port, tmp, args.workers, args.threads)
+            try:
+                load(port, args.clients, min(args.seconds, 2), args.uncached)  # warm up
+                latencies, errors, elapsed = load(port, args.clients, args.seconds, args.uncached)
+            finally:
+                stop()
+            stats = percentiles(latencies) if latencies else {'p50': None, 'p95': None}
+            results[server] = rps = len(latencies) / elapsed
+            label = server if server == 'dev' else f'asgi ({args.workers}x{args.threads})'
+            print(f"{label:<16} {rps:>8.1f} req/s  p50 {stats['p50']} ms  p95 {stats['p95']} ms  "
+                  f"errors {errors}  ({len(latencies):,} requests, {args.clients} clients)")
+        if len(results) == 2 and results['dev']:
+            print(f"asgi/dev throughput: {results['asgi'] / results['dev']:.2f}x")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
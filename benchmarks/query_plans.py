@@ -0,0 +1,142 @@
+"""Query plans and timings for the study dashboard queries, before and after migrations.
+
+Builds a throwaway study_sessions table (1M rows by default), runs the queries
+behind /api/study-data and /api/calendar-data, then applies the study habit's
+migrations (habits.run_migrations) and runs them again.
+
+    python benchmarks/query_plans.py --rows 1000000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from habits import REGISTRY, run_migrations  # noqa: E402
+
+TOPICS = ['coding', 'math', 'ai', 'ml', 'stats', 'other']
+LOCATIONS = ['library', 'coffee', 'house']
+
+def build_database(path, rows, days):
+    """Create study_sessions with `rows` random sessions spread over `days` days."""
+    today = date.today()
+    random.seed(42)
+    with sqlite3.connect(path) as conn:
+        c = conn.cursor()
+        c.execute('''
+            CREATE TABLE study_sessions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                date TEXT,
+                time TEXT,
+                hours REAL,
+                topic TEXT,
+                location TEXT
+            )
+        ''')
+        c.executemany('''
+            INSERT INTO study_sessions (date, time, hours, topic, location)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (
+            (
+                (today - timedelta(days=random.randrange(days))).strftime('%Y-%m-%d'),
+                f"{random.randrange(8, 24):02}:{random.choice([0, 15, 30, 45]):02}",
+                round(random.uniform(1, 3.5), 1),
+                random.choice(TOPICS),
+                random.choice(LOCATIONS),
+            )
+            for _ in range(rows)
+        ))
+        # The app's init_db creates daily_totals ahead of the migrations, which build on it
+        c.execute('''
+            CREATE TABLE daily_totals (
+                date TEXT PRIMARY KEY,
+                hours REAL NOT NULL DEFAULT 0,
+                sessions INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        c.execute('INSERT INTO daily_totals SELECT date, SUM(hours), COUNT(*) FROM study_sessions GROUP BY date')
+        conn.commit()
+
+def dashboard_queries(migrated):
+    """The (label, sql, params) triples run by one dashboard load, before or after the migrations."""
+    today = date.today()
+    week_start = today - timedelta(days=today.weekday())
+    week_end = week_start + timedelta(days=6)
+    thirty_days_ago = today - timedelta(days=30)
+    year_start = date(today.year, 1, 1)
+    hour = 'hour' if migrated else 'substr(time, 1, 2)'
+    # The migrations replace the topic text with an id into study.topics
+    topic = 'topic_id' if migrated else 'topic'
+    return [
+        ('daily totals', '''
+            SELECT date, SUM(hours) FROM study_sessions GROUP BY date ORDER BY date
+        ''', ()),
+        ('current week', '''
+            SELECT date, SUM(hours) FROM study_sessions
+            WHERE date BETWEEN ? AND ? GROUP BY date ORDER BY date
+        ''', (week_start.isoformat(), week_end.isoformat())),
+        ('topic balance', f'''
+            SELECT {topic}, SUM(hours) AS total FROM study_sessions
+            WHERE date >= ? GROUP BY {topic} ORDER BY total DESC
+        ''', (thirty_days_ago.isoformat(),)),
+        ('hourly', f'''
+            SELECT {hour} AS h, SUM(hours) FROM study_sessions GROUP BY h ORDER BY h
+        ''', ()),
+        ('calendar year', f'''
+            SELECT date, SUM(hours), GROUP_CONCAT(DISTINCT {topic}) FROM study_sessions
+            WHERE date BETWEEN ? AND ? GROUP BY date
+        ''', (year_start.isoformat(), today.isoformat())),
+    ]
+
+def time_query(conn, sql, params, repeat):
+    """Best-of-`repeat` wall time in milliseconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn.execute(sql, params).fetchall()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def report(conn, title, migrated, repeat):
+    print(f'\n=== {title} ===')
+    timings = {}
+    for label, sql, params in dashboard_queries(migrated):
+        plan = conn.execute('EXPLAIN QUERY PLAN ' + sql, params).fetchall()
+        timings[label] = time_query(conn, sql, params, repeat)
+        print(f'{label:<14} {timings[label]:>9.2f} ms')
+        for row in plan:
+            print(f'    {row[-1]}')
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--days', type=int, default=3650, help='spread sessions over this many days')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        print(f'Seeding {args.rows:,} sessions over {args.days} days...')
+        build_database(path, args.rows, args.days)
+        with sqlite3.connect(':memory:') as conn:
+            # Migrations are schema-qualified, like the app's attached databases
+            conn.execute('ATTACH DATABASE ? AS study', (path,))
+            before = report(conn, 'before migrations', False, args.repeat)
+            start = time.perf_counter()
+            run_migrations(conn, REGISTRY['study'])
+            print(f'\nrun_migrations took {time.perf_counter() - start:.2f} s')
+            after = report(conn, 'after migrations', True, args.repeat)
+
+    print('\n=== speedup ===')
+    for label in before:
+        print(f'{label:<14} {before[label] / after[label]:>7.1f}x')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,236 @@
+"""Synthetic habit data for load testing, drawn in NumPy batches.
+
+The per-app seed.py scripts draw one session at a time and insert row by
+row, which is fine for a year of demo data but far too slow for decades of
+it. This draws whole columns at once from the same distributions (summer
+breaks, missed days, a fuller last 30 days, study topics weighted by
+weekday, locations by hour) and loads each habit with one executemany in
+a single transaction.
+
+    python benchmarks/seed_synthetic.py --years 20 --users 4 --seed 7
+    python benchmarks/seed_synthetic.py --habits study sleep --out /tmp/load
+
+Without --out it replaces the rows in each habit's own database, like
+seed.py does. The tables have no user column, so every simulated user adds
+an independent stream of sessions to the same days. --rows-per-day fixes
+the number of sessions per active day and user instead of drawing it.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from datetime import date
+
+try:
+    import numpy as np
+except ImportError:
+    sys.exit('seed_synthetic.py needs NumPy: pip install numpy')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import habits  # noqa: E402
+
+MINUTES = [0, 15, 30, 45]
+# 'HH:MM' for every minute of the day, indexed by hour * 60 + minute
+TIMES = np.array([f'{hour:02}:{minute:02}' for hour in range(24) for minute in range(60)])
+
+def draw(rng, options, weights, size):
+    """size picks from options with random.choices-style relative weights."""
+    p = np.asarray(weights, dtype=np.float64)
+    return np.asarray(options)[rng.choice(len(options), size=size, p=p / p.sum())]
+
+def draw_counts(rng, days, options, weights, recent_weights=None, rows_per_day=None):
+    """Sessions per day; recent_weights apply to the last 30 days."""
+    if rows_per_day is not None:
+        return np.full(len(days['ago']), rows_per_day)
+    counts = draw(rng, options, weights, len(days['ago']))
+    if recent_weights is not None:
+        recent = draw(rng, options, recent_weights, len(days['ago']))
+        counts = np.where(days['ago'] < 30, recent, counts)
+    return counts
+
+def calendar(years, users):
+    """Day arrays, oldest first, with each day repeated once per user."""
+    ago = np.repeat(np.arange(int(years * 365) - 1, -1, -1), users)
+    dates = np.datetime64(date.today(), 'D') - ago
+    return {
+        'ago': ago,
+        'dates': dates,
+        'month': dates.astype('datetime64[M]').astype(np.int64) % 12 + 1,
+        'weekday': (dates.astype(np.int64) + 3) % 7,  # 1970-01-01 was a Thursday
+    }
+
+def expand(days, keep, counts):
+    """Per-session day fields for `counts` sessions on every kept day."""
+    index = np.repeat(np.arange(len(keep)), np.where(keep, counts, 0))
+    return {field: values[index] for field, values in days.items()}
+
+def summer_break(rng, days, chance):
+    return np.isin(days['month'], (7, 8)) & (rng.random(len(days['ago'])) < chance)
+
+def missed_day(rng, days, chance):
+    return (rng.random(len(days['ago'])) < chance) & (days['ago'] > 30)
+
+# ========== Habits ==========
+def study_sessions(rng, days, rows_per_day=None):
+    keep = ~summer_break(rng, days, 0.6) & ~missed_day(rng, days, 0.25)
+    counts = draw_counts(rng, days, [1, 2, 3], [6, 3, 1], [2, 4, 4], rows_per_day)
+    s = expand(days, keep, counts)
+    n = len(s['ago'])
+
+    hour = draw(rng, range(8, 24), [2]*4 + [4]*6 + [3]*6, n)
+    minute = draw(rng, MINUTES, [1]*4, n)
+    topics = ['coding', 'math', 'ai', 'ml', 'stats', 'other']
+    # Simulate focus rotation during the week
+    topic = np.where(s['weekday'] < 5,
+                     draw(rng, topics, [5, 4, 3, 2, 2, 1], n),
+                     draw(rng, topics, [3, 3, 3, 2, 2, 3], n))
+    location = np.select(
+        [hour < 18, hour < 22],
+        [draw(rng, ['library', 'coffee'], [0.6, 0.4], n),
+         draw(rng, ['house', 'library', 'coffee'], [0.4, 0.3, 0.3], n)],
+        'house')
+    return {
+        'date': s['dates'].astype(str),
+        'time': TIMES[hour * 60 + minute],
+        'hour': hour,
+        'minute_of_day': hour * 60 + minute,
+        'hours': np.round(rng.uniform(1, 3.5, n), 1),
+        'topic': topic,
+        'location': location,
+    }
+
+def sleep_sessions(rng, days, rows_per_day=None):
+    keep = ~missed_day(rng, days, 0.1)
+    s = expand(days, keep, draw_counts(rng, days, [1], [1], rows_per_day=rows_per_day))
+    n = len(s['ago'])
+
+    hour = draw(rng, list(range(21, 24)) + list(range(0, 6)), [2]*3 + [4]*6, n)
+    minute = draw(rng, MINUTES, [1]*4, n)
+    qualities = ['deep', 'light', 'restless', 'interrupted', 'refreshing']
+    quality = np.where(s['weekday'] < 5,
+                       draw(rng, qualities, [3, 2, 2, 1, 4], n),
+                       draw(rng, qualities, [4, 2, 1, 1, 3], n))
+    location = np.where(hour < 22, draw(rng, ['bedroom', 'living_room'], [0.8, 0.2], n), 'bedroom')
+    return {
+        'date': s['dates'].astype(str),
+        'time': TIMES[hour * 60 + minute],
+        'hour': hour,
+        'minute_of_day': hour * 60 + minute,
+        'hours': np.round(rng.uniform(5, 9, n), 1),
+        'quality': quality,
+        'location': location,
+    }
+
+def sports_sessions(rng, days, rows_per_day=None):
+    # sports/seed.py keeps every day of the first month of its range, not the last
+    since_start = days['ago'].max() - days['ago']
+    keep = ~((rng.random(len(since_start)) < 0.25) & (since_start > 30))
+    counts = draw_counts(rng, days, [1, 2], [1, 1], rows_per_day=rows_per_day)
+    s = expand(days, keep, counts)
+    n = len(s['ago'])
+
+    duration = np.round(rng.uniform(0.5, 2.0, n), 1)
+    # Simulate holiday breaks in July and August with reduced activity
+    summer = np.isin(s['month'], (7, 8))
+    duration = np.where(summer, duration * 0.7, duration)
+    kept = ~(summer & (rng.random(n) < 0.5))
+    hour = rng.integers(6, 22, n)
+    minute = draw(rng, MINUTES, [1]*4, n)
+    activities = ['Running', 'Swimming', 'Cycling', 'Gym Workout', 'Basketball', 'Tennis', 'Yoga', 'HIIT']
+    locations = ['Local Gym', 'Park', 'Swimming Pool', 'Home', 'Sports Center', 'Tennis Court', 'Fitness Studio']
+    return {
+        'date': s['dates'].astype(str)[kept],
+        'time': TIMES[hour * 60 + minute][kept],
+        'hour': hour[kept],
+        'minute_of_day': (hour * 60 + minute)[kept],
+        'duration': duration[kept],
+        'activity': draw(rng, activities, [1]*len(activities), n)[kept],
+        'location': draw(rng, locations, [1]*len(locations), n)[kept],
+    }
+
+def budget_entries(rng, days, rows_per_day=None):
+    keep = ~summer_break(rng, days, 0.6) & ~missed_day(rng, days, 0.25)
+    counts = draw_counts(rng, days, [1, 2, 3], [4, 4, 2], [2, 4, 4], rows_per_day)
+    s = expand(days, keep, counts)
+    n = len(s['ago'])
+
+    categories = ['groceries', 'dining', 'transport', 'entertainment', 'utilities', 'shopping']
+    descriptions = np.array([
+        ['Weekly groceries', 'Food shopping', 'Supermarket run'],
+        ['Restaurant dinner', 'Coffee shop', 'Takeout'],
+        ['Bus fare', 'Train ticket', 'Taxi ride'],
+        ['Movie tickets', 'Concert', 'Museum visit'],
+        ['Electricity bill', 'Water bill', 'Internet bill'],
+        ['Clothing', 'Electronics', 'Home goods'],
+    ])
+    category = draw(rng, range(len(categories)), [3, 2, 2, 1, 2, 2], n)
+    return {
+        'date': s['dates'].astype(str),
+        'amount': np.round(rng.uniform(5, 100, n), 2),
+        'category': np.asarray(categories)[category],
+        'description': descriptions[category, rng.integers(0, 3, n)],
+    }
+
+GENERATORS = {
+    'study': study_sessions,
+    'sleep': sleep_sessions,
+    'sports': sports_sessions,
+    'budget': budget_entries,
+}
+
+# ========== Loading ==========
+def load(path, habit, columns):
+    """Replace the habit's rows in the database at path, in one transaction."""
+    conn = sqlite3.connect(':memory:')
+    try:
+        # Attached under the habit's name, so the schema-qualified habits SQL applies
+        conn.execute(f'ATTACH DATABASE ? AS {habit.name}', (path,))
+        habits.init_db(conn, habit)
+        c = conn.cursor()
+        c.execute(f'DELETE FROM {habit.sessions}')
+        # Lookup columns are stored as ids: look each distinct name up once, then index by it
+        for column in habit.lookups:
+            names, codes = np.unique(columns[column], return_inverse=True)
+            ids = habits.lookup_ids(c, habit, column, names.tolist())
+            columns[f'{column}_id'] = np.array([ids[name] for name in names.tolist()])[codes]
+        rows = list(zip(*(columns[column].tolist() for column in habit.stored_columns)))
+        c.executemany(f'''
+            INSERT INTO {habit.sessions} ({", ".join(habit.stored_columns)})
+            VALUES ({", ".join("?" * len(habit.stored_columns))})
+        ''', rows)
+        habits.rebuild_rollups(conn, habit)  # commits the whole load
+    finally:
+        conn.close()
+    return len(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--habits', nargs='+', choices=list(GENERATORS), default=list(GENERATORS))
+    parser.add_argument('--years', type=float, default=1)
+    parser.add_argument('--users', type=int, default=1, help='independent session streams per habit')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--rows-per-day', type=int, default=None,
+                        help='sessions per active day and user (default: drawn like seed.py)')
+    parser.add_argument('--out', help="write <out>/<habit's database file name> instead of the app's databases")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    days = calendar(args.years, args.users)
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+
+    for name in args.habits:
+        habit = habits.REGISTRY[name]
+        path = os.path.join(args.out, os.path.basename(habit.database)) if args.out else habit.database
+        start = time.perf_counter()
+        columns = GENERATORS[name](rng, days, args.rows_per_day)
+        generated = time.perf_counter() - start
+        count = load(path, habit, columns)
+        print(f'✅ {count:,} {name} rows ({args.years:g} years, {args.users} users) -> {path} '
+              f'[generate {generated:.2f}s, load {time.perf_counter() - start - generated:.2f}s]')
+
+if __name__ == '__main__':
+    main()
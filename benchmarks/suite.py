@@ -0,0 +1,233 @@
+"""Latency, query count and memory of the study analytics at 1k, 100k and 1M sessions.
+
+Each size runs in a fresh child process, which seeds a throwaway study
+database (the other habits get empty ones, so /api/overview works and the
+real .db files are never opened). The child then measures
+  * each route through Flask's test client, with the response cache bumped
+    before every call so the view really runs
+  * each helper behind those routes, called directly with its caches reset
+reporting p50/p95 in milliseconds, SQL statements per call and the child's
+peak RSS. Results are written as JSON, one file per run, so two commits can
+be compared on the same machine:
+
+    python benchmarks/suite.py                       # -> benchmarks/results/<commit>.json
+    python benchmarks/suite.py --sizes 1000,100000 --repeat 50 --output before.json
+    python benchmarks/suite.py --compare before.json after.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from multiprocessing import get_context
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+ROUTES = {
+    'study-data': '/api/study-data',
+    'study-data windows': '/api/study-data?windows=7,30,90&fillGaps=1',
+    'study-data streak widget': '/api/study-data?fields=streaks,goalProgress',
+    'study-data last year': '/api/study-data?fields=dailyData,movingAvgData&from={last_year}',
+    'study-data series': '/api/study-data/series?granularity=month',
+    'calendar-data': '/api/calendar-data',
+    'calendar-data 5y': '/api/calendar-data?from={five_years_ago}-01-01&to={this_year}-12-31',
+    'overview': '/api/overview',
+}
+
+def percentiles(samples):
+    """p50/p95 (ms) of per-call durations in seconds."""
+    ms = sorted(s * 1000 for s in samples)
+    p95 = statistics.quantiles(ms, n=20, method='inclusive')[18] if len(ms) > 1 else ms[0]
+    return {'p50': round(statistics.median(ms), 3), 'p95': round(p95, 3)}
+
+def measure(fn, repeat, count_on=None):
+    """Time repeat calls of fn after one warm-up; count_on(fn) returns its statement count."""
+    fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    result = percentiles(samples)
+    if count_on is not None:
+        # Counted in a separate call so the trace callback doesn't skew the timings
+        result['queries'] = count_on(fn)
+    return result
+
+def run_size(sessions, max_days, repeat):
+    """Benchmark one database size; runs in a child process."""
+    import analytics
+    import app
+    import habits
+    from cache import WatermarkCache
+    from query_plans import build_database
+
+    study = habits.REGISTRY['study']
+    tmp = tempfile.mkdtemp(prefix='habits-bench-')
+    # Two sessions a day until the history reaches max_days, then denser days
+    days = max(1, min(max_days, sessions // 2))
+    start = time.perf_counter()
+    build_database(os.path.join(tmp, 'study.db'), sessions, days)
+    seeded = time.perf_counter() - start
+
+    # Point every habit at a throwaway file before the pool opens a connection
+    for habit in habits.HABITS:
+        habit.database = os.path.join(tmp, f'{habit.name}.db')
+    app.pool.attached = {habit.name: habit.database for habit in habits.HABITS}
+    app.init_db()
+
+    statements = [0]
+    def count(statement):
+        statements[0] += 1
+
+    def count_on(fn):
+        # Every idle pooled connection gets the callback, since any may serve the call
+        conns = [app.pool.acquire() for _ in range(app.pool.statistics()['idle'])]
+        for conn in conns:
+            conn.set_trace_callback(count)
+            app.pool.release(conn)
+        statements[0] = 0
+        fn()
+        for conn in conns:
+            conn.set_trace_callback(None)
+        return statements[0]
+
+    client = app.app.test_client()
+    today = date.today()
+    results = {'sessions': sessions, 'days': days, 'seedSeconds': round(seeded, 2), 'routes': {}, 'helpers': {}}
+    for label, url in ROUTES.items():
+        url = url.format(five_years_ago=today.year - 4, this_year=today.year,
+                         last_year=(today - timedelta(days=365)).isoformat())
+
+        def route(url=url):
+            app.response_cache.bump()
+            response = client.get(url)
+            assert response.status_code == 200, (url, response.status_code)
+        results['routes'][label] = {'url': url, **measure(route, repeat, count_on)}
+
+    conn = app.pool.connect()
+    try:
+        c = conn.cursor()
+        c.execute('SELECT date, hours FROM study.daily_totals ORDER BY date')
+        daily_data = [{'date': day, 'hours': hours} for day, hours in c.fetchall()]
+
+        def series():
+            return analytics.DailySeries(daily_data) if analytics.ENABLED else None
+
+        def dashboard():
+            study.streak_cache = WatermarkCache()
+            habits.build_dashboard(c, study)
+
+        def calendar():
+            study.calendar_cache.clear()
+            habits.get_calendar_data(c, study, date(today.year, 1, 1), date(today.year, 12, 31), today)
+
+        def counted_helper(fn):
+            conn.set_trace_callback(count)
+            statements[0] = 0
+            try:
+                fn()
+            finally:
+                conn.set_trace_callback(None)
+            return statements[0]
+
+        results['helpers'] = {
+            'build_dashboard': measure(dashboard, repeat, counted_helper),
+            'get_calendar_data': measure(calendar, repeat, counted_helper),
+            'calculate_streaks': measure(lambda: habits.calculate_streaks(study, daily_data, series()), repeat),
+            'calculate_moving_averages': measure(
+                lambda: habits.calculate_moving_averages(daily_data, (7, 30, 90), True), repeat),
+        }
+    finally:
+        conn.close()
+    app.pool.close_all()
+    for name in os.listdir(tmp):
+        os.remove(os.path.join(tmp, name))
+    os.rmdir(tmp)
+
+    # ru_maxrss is in kilobytes on Linux
+    results['peakRssMb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return results
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = 'unknown'
+    import analytics
+    return {
+        'commit': commit,
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'analytics': 'numpy' if analytics.ENABLED else 'python',
+    }
+
+def compare(before_path, after_path):
+    """Print after/before p50 ratios for every size, route and helper in both files."""
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    print(f"{before['environment']['commit']} -> {after['environment']['commit']}")
+    old_sizes = {r['sessions']: r for r in before['results']}
+    for new in after['results']:
+        old = old_sizes.get(new['sessions'])
+        if old is None:
+            continue
+        print(f"\n{new['sessions']:,} sessions  (peak RSS {old['peakRssMb']} -> {new['peakRssMb']} MB)")
+        for group in ('routes', 'helpers'):
+            for label, stats in new[group].items():
+                if label not in old[group]:
+                    continue
+                was = old[group][label]
+                ratio = stats['p50'] / was['p50'] if was['p50'] else float('inf')
+                queries = f"  queries {was.get('queries', '-')} -> {stats.get('queries', '-')}"
+                print(f"  {label:<26} p50 {was['p50']:>9.2f} -> {stats['p50']:>9.2f} ms  {ratio:>5.2f}x{queries}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1000,100000,1000000')
+    parser.add_argument('--days', type=int, default=3650, help='spread sessions over at most this many days')
+    parser.add_argument('--repeat', type=int, default=30)
+    parser.add_argument('--output', help='JSON file to write (default: benchmarks/results/<commit>.json)')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help='compare two result files and exit')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    env = environment()
+    output = args.output or os.path.join(ROOT, 'benchmarks', 'results', f"{env['commit']}.json")
+    results = []
+    for size in (int(s) for s in args.sizes.split(',')):
+        # A fresh process per size, so peak RSS and caches belong to that size alone
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as pool:
+            r = pool.submit(run_size, size, args.days, args.repeat).result()
+        results.append(r)
+        print(f"\n{r['sessions']:,} sessions over {r['days']:,} days  (peak RSS {r['peakRssMb']} MB)")
+        for group in ('routes', 'helpers'):
+            for label, stats in r[group].items():
+                print(f"  {label:<26} p50 {stats['p50']:>9.2f} ms  p95 {stats['p95']:>9.2f} ms"
+                      f"  queries {stats.get('queries', '-')}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({'environment': env, 'repeat': args.repeat, 'results': results}, f, indent=2)
+    print(f'\nSaved {output}')
+
+if __name__ == '__main__':
+    main()
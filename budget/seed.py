@@ -1,22 +1,24 @@
+import os
 import sqlite3
+import sys
 from datetime import datetime, timedelta
 import random
 
+# The app's habits module lives one directory up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import habits  # noqa: E402
+
 DATABASE = 'budget.db'
 
+HABIT = habits.REGISTRY['budget']
+
 def init_db():
-    with sqlite3.connect(DATABASE) as conn:
-        c = conn.cursor()
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS budget_entries (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date TEXT,
-                amount REAL,
-                category TEXT,
-                description TEXT
-            )
-        ''')
-        conn.commit()
+    """Connection with DATABASE attached, its tables created and migrated the app's way."""
+    conn = sqlite3.connect(':memory:')
+    conn.execute(f'ATTACH DATABASE ? AS {HABIT.name}', (DATABASE,))
+    habits.init_db(conn, HABIT)
+    return conn
 
 def pick_category():
     categories = ['groceries', 'dining', 'transport', 'entertainment', 'utilities', 'shopping']
@@ -49,11 +51,11 @@ def generate_entries(date, is_recent=False):
     return entries
 
 def seed_data():
-    init_db()
-    with sqlite3.connect(DATABASE) as conn:
+    with init_db() as conn:
         c = conn.cursor()
-        c.execute('DELETE FROM budget_entries')
+        c.execute(f'DELETE FROM {HABIT.sessions}')
 
+        entries = []
         today = datetime.now()
         for i in range(365):  # Generate a year of data
             date = today - timedelta(days=i)
@@ -67,13 +69,11 @@ def seed_data():
                 continue
 
             is_recent = i < 30  # last 30 days should have full data
-            for entry in generate_entries(date, is_recent):
-                c.execute('''
-                    INSERT INTO budget_entries (date, amount, category, description)
-                    VALUES (?, ?, ?, ?)
-                ''', entry)
+            entries.extend(generate_entries(date, is_recent))
 
-        conn.commit()
+        habits.insert_sessions(conn, HABIT, entries)
+        # The rollups still counted the deleted rows; recompute them from the table
+        habits.rebuild_rollups(conn, HABIT)
         print("✅ Year of realistic budget data inserted.")
 
 if __name__ == '__main__':
@@ -0,0 +1,176 @@
+"""Small in-process caches shared by the habit apps."""
+import functools
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+
+from flask import Response, current_app, request
+
+import profiling
+
+class WatermarkCache:
+    """Keeps one computed value until its key changes.
+
+    The key is typically a table watermark (e.g. the highest session id) plus
+    anything else the value depends on, such as today's date. Reads and the
+    single-tuple swap are safe to share across request threads.
+    """
+
+    def __init__(self):
+        self._entry = None
+
+    def get(self, key, compute):
+        entry = self._entry
+        if entry is not None and entry[0] == key:
+            return entry[1]
+        value = compute()
+        self._entry = (key, value)
+        return value
+
+class NameMap:
+    """The id <-> name map of one lookup table (e.g. study.topics), kept in this process.
+
+    Lookup rows are only ever added, never renamed or deleted, so an entry
+    once read stays right. The table is only reread when asked for an id
+    that isn't known yet, i.e. one added since, possibly by another process.
+    ids() never reads the table, so inserts can't cache a name whose
+    transaction is later rolled back.
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self._maps = ({}, {})  # (id -> name, name -> id), swapped as one tuple
+
+    def load(self, c):
+        """Reread the whole table on cursor c."""
+        c.execute(f'SELECT id, name FROM {self.table}')
+        names = dict(c.fetchall())
+        self._maps = (names, {name: id_ for id_, name in names.items()})
+
+    def names(self, c, ids):
+        """{id: name} for ids (None stays None), rereading the table for unknown ids."""
+        names = self._maps[0]
+        if any(id_ is not None and id_ not in names for id_ in ids):
+            self.load(c)
+            names = self._maps[0]
+        return {id_: names.get(id_) for id_ in ids}
+
+    def ids(self, names):
+        """{name: id} for the names among names that are already known."""
+        ids = self._maps[1]
+        return {name: ids[name] for name in names if name in ids}
+
+class LRUCache:
+    """Bounded mapping that evicts the least recently used entry."""
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+class ResponseCache:
+    """Serialized JSON of the read-only routes, revalidated with ETags.
+
+    version is called on every cached request and returns a tuple of
+    numbers that changes with the data, read from the database (the app
+    passes every habit's highest session id), so a write by any process
+    moves it. While it stays the same, a cached route's bytes are reused for
+    the same URL, and a browser that sends back the current ETag (or a
+    Last-Modified date that's still current) gets a 304 without the view
+    running. The ETag
+    also carries today's date, since streaks, week ranges and the calendar's
+    today marker roll over at midnight, and a token naming the app's run, so
+    tags from an earlier deploy never match. Server workers started
+    together must share the token (see asgi.py); the version then means the
+    same data in each of them.
+
+    Last-Modified is when this process first saw the current version.
+    """
+
+    def __init__(self, version, maxsize=32, token=None):
+        self._version = version
+        self._seen = None
+        self.modified = self._now()
+        self._token = token or format(int(time.time()), 'x')
+        self._lock = threading.Lock()
+        self._responses = LRUCache(maxsize)
+
+    @staticmethod
+    def _now():
+        return datetime.now(timezone.utc).replace(microsecond=0)
+
+    def bump(self):
+        """Drop the stored responses, e.g. right after an insert or between benchmark runs."""
+        self._responses.clear()
+
+    def _current(self):
+        """(version, Last-Modified) as of now."""
+        version = self._version()
+        with self._lock:
+            if version != self._seen:
+                self._seen = version
+                # HTTP dates only have whole seconds, so a change within the second
+                # a client was last sent must still move Last-Modified forward
+                self.modified = max(self._now(), self.modified + timedelta(seconds=1))
+                self._responses.clear()
+            return version, self.modified
+
+    def cached(self, view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.args.get('timings') == '1' or profiling.profile_requested():
+                return view(*args, **kwargs)  # instrumented requests time the real work
+
+            version, modified = self._current()
+            today = date.today()
+            etag = f"{self._token}-{'.'.join(map(str, version))}-{today:%Y%m%d}"
+            midnight = datetime.combine(today, datetime.min.time()).astimezone(timezone.utc)
+            last_modified = max(modified, midnight)
+
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains(etag)
+            else:
+                since = request.if_modified_since
+                not_modified = since is not None and since >= last_modified
+
+            if not_modified:
+                response = Response(status=304)
+            else:
+                key = (version, today, request.full_path)
+                entry = self._responses.get(key)
+                if entry is None:
+                    # A fresh response keeps the view's own headers (e.g. Server-Timing)
+                    response = current_app.make_response(view(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                    self._responses.put(key, (response.get_data(), response.mimetype))
+                else:
+                    response = Response(entry[0], mimetype=entry[1])
+
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
@@ -0,0 +1,120 @@
+"""Pooled SQLite connections shared by the habit apps.
+
+A ConnectionPool opens one database file and can ATTACH others under schema
+names, so a single pool serves several databases. A request checks a
+connection out the first time it calls get_db() and hands it back when the
+Flask app context tears down, so connections (and their page cache and parsed
+schema) are reused across requests instead of being reopened every time.
+"""
+import queue
+import sqlite3
+import threading
+
+from flask import g
+
+# Applied to the main and every attached database of a new connection. WAL
+# lets dashboard reads carry on while a session insert is committing, and
+# NORMAL sync is durable enough under WAL.
+DATABASE_PRAGMAS = (
+    'journal_mode = WAL',
+    'synchronous = NORMAL',
+    'cache_size = -16000',     # ~16 MB page cache per database
+    'mmap_size = 268435456',   # map up to 256 MB of the file
+)
+
+# Applied once per connection.
+CONNECTION_PRAGMAS = (
+    'temp_store = MEMORY',
+    'busy_timeout = 5000',
+)
+
+class ConnectionPool:
+    """A small LIFO pool of tuned connections to one SQLite database.
+
+    attached maps schema names to further database files that every
+    connection ATTACHes, e.g. {'sleep': 'sleeping/sleeping.db'}.
+    """
+
+    def __init__(self, database, attached=None, max_idle=8):
+        self.database = database
+        self.attached = dict(attached or {})
+        self._idle = queue.LifoQueue(maxsize=max_idle)
+        self._lock = threading.Lock()
+        self._stats = {'opened': 0, 'reused': 0, 'returned': 0, 'discarded': 0, 'inUse': 0}
+
+    def init_app(self, app):
+        """Return checked-out connections to the pool when each app context ends."""
+        app.teardown_appcontext(self._teardown)
+
+    def connect(self):
+        """Open a new connection with the pragmas applied, outside the pool."""
+        conn = sqlite3.connect(self.database, check_same_thread=False)
+        for schema, path in self.attached.items():
+            conn.execute(f'ATTACH DATABASE ? AS {schema}', (path,))
+        for schema in ('main', *self.attached):
+            for pragma in DATABASE_PRAGMAS:
+                conn.execute(f'PRAGMA {schema}.{pragma}')
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(f'PRAGMA {pragma}')
+        with self._lock:
+            self._stats['opened'] += 1
+        return conn
+
+    def acquire(self):
+        try:
+            conn = self._idle.get_nowait()
+            reused = True
+        except queue.Empty:
+            conn = self.connect()
+            reused = False
+        with self._lock:
+            self._stats['inUse'] += 1
+            if reused:
+                self._stats['reused'] += 1
+        return conn
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            self._idle.put_nowait(conn)
+            returned = True
+        except queue.Full:
+            conn.close()
+            returned = False
+        with self._lock:
+            self._stats['inUse'] -= 1
+            self._stats['returned' if returned else 'discarded'] += 1
+
+    def get_db(self):
+        """Connection for the current app context, checked out on first use."""
+        connections = g.setdefault('_pooled_connections', {})
+        if self not in connections:
+            connections[self] = self.acquire()
+        return connections[self]
+
+    def _teardown(self, exc):
+        conn = g.get('_pooled_connections', {}).pop(self, None)
+        if conn is not None:
+            self.release(conn)
+
+    def close_all(self):
+        """Close every idle connection, e.g. before deleting the database file."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def resize(self, max_idle):
+        """Keep up to max_idle idle connections, e.g. one per server thread."""
+        with self._idle.mutex:
+            self._idle.maxsize = max_idle
+
+    def statistics(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['idle'] = self._idle.qsize()
+        stats['database'] = self.database
+        stats['attached'] = dict(self.attached)
+        return stats
@@ -0,0 +1,150 @@
+"""Live dashboard updates over server-sent events (/api/stream).
+
+One watcher thread per process owns a connection and, while any stream is
+open, checks each habit's highest row id every POLL_SECONDS, or at once
+when an insert in this process calls notify(). When a habit has new rows
+it builds one delta with habits.build_update (the changed days' totals,
+what the rows add to the category balance and hour histogram, and the
+habit's fresh week and streaks), encodes it once and hands the same bytes
+to every subscribed stream. However many tabs are open, a change costs one
+delta, not a dashboard recomputation per tab, and polling the ids also
+catches rows written by other worker processes or by importer.py.
+
+Each stream buffers at most BACKLOG messages; a client that falls further
+behind, or a change too big for a delta, gets a 'resync' event telling
+it to refetch the dashboard. That refetch sees the new rows: the response
+cache's version is read from the same row ids (see app.data_version), so
+whichever worker answers it serves fresh data rather than stored bytes or
+a 304.
+"""
+import json
+import logging
+import sqlite3
+import threading
+
+import habits
+
+logger = logging.getLogger(__name__)
+
+POLL_SECONDS = 1.0
+KEEPALIVE_SECONDS = 15
+BACKLOG = 100
+
+RETRY = 'retry: 3000\n\n'  # EventSource reconnect delay (ms)
+KEEPALIVE = ': keepalive\n\n'
+# Keep proxies from caching or buffering the stream
+HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+def format_event(event, data):
+    """One SSE message; data is sent as a single line of JSON."""
+    return f'event: {event}\ndata: {json.dumps(data, separators=(",", ":"))}\n\n'
+
+def parse_habits(arg):
+    """Habit names from ?habits=study,sleep (all of them when left out); raises ValueError."""
+    if not arg:
+        return set(habits.REGISTRY)
+    names = {name.strip() for name in arg.split(',') if name.strip()}
+    unknown = names - set(habits.REGISTRY)
+    if unknown:
+        raise ValueError(f"unknown habit {sorted(unknown)[0]!r}")
+    return names
+
+class Subscription:
+    """Messages waiting for one open stream.
+
+    wake is called, from the watcher thread, after each push; it must not
+    block (threading.Event.set, or loop.call_soon_threadsafe for asyncio).
+    """
+
+    def __init__(self, names, wake):
+        self.names = names
+        self._wake = wake
+        self._messages = []
+        self._lock = threading.Lock()
+
+    def push(self, message):
+        with self._lock:
+            if len(self._messages) >= BACKLOG:
+                self._messages = [format_event('resync', {'reason': 'backlog'})]
+            else:
+                self._messages.append(message)
+        self._wake()
+
+    def drain(self):
+        """The waiting messages joined into one chunk ('' when there are none)."""
+        with self._lock:
+            messages, self._messages = self._messages, []
+        return ''.join(messages)
+
+class LiveUpdates:
+    def __init__(self, pool, habit_list):
+        self.pool = pool
+        self.habit_list = habit_list
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+        self._changed = threading.Event()
+        self._thread = None
+
+    def subscribe(self, names, wake):
+        """Start delivering updates for the habits in names; returns the Subscription."""
+        subscription = Subscription(names, wake)
+        with self._lock:
+            self._subscriptions.add(subscription)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='live-updates', daemon=True)
+                self._thread.start()
+        self._changed.set()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def notify(self):
+        """Check for new rows now instead of at the next poll; call after an insert."""
+        self._changed.set()
+
+    def publish(self, name, message):
+        """Push one encoded message to every stream subscribed to habit name."""
+        with self._lock:
+            subscriptions = [s for s in self._subscriptions if name in s.names]
+        for subscription in subscriptions:
+            subscription.push(message)
+        return len(subscriptions)
+
+    def _run(self):
+        conn = self.pool.connect()
+        c = conn.cursor()
+        seen = None
+        while True:
+            self._changed.wait(POLL_SECONDS)
+            self._changed.clear()
+            with self._lock:
+                idle = not self._subscriptions
+            if idle:
+                # Nobody is listening: stop polling, and start from scratch next time
+                seen = None
+                self._changed.wait()
+                continue
+            try:
+                current = habits.watermarks(c, self.habit_list)
+                if seen is not None:
+                    for habit in self.habit_list:
+                        since, until = seen[habit.name], current[habit.name]
+                        if until > since:
+                            update = habits.build_update(c, habit, since, until)
+                            if update is None:
+                                message = format_event('resync', {'habit': habit.name, 'reason': 'large change'})
+                            else:
+                                message = format_event('update', update)
+                            self.publish(habit.name, message)
+                seen = current
+            except sqlite3.Error as e:  # keep watching; the next poll retries
+                logger.error('live updates: %s', e)
+            except Exception:
+                # Retrying the same delta would fail again: have the clients refetch
+                # instead, and keep watching from the current ids
+                logger.exception('live updates: building an update failed')
+                for habit in self.habit_list:
+                    self.publish(habit.name, format_event('resync', {'habit': habit.name, 'reason': 'error'}))
+                seen = None
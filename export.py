@@ -0,0 +1,138 @@
+"""Streaming export of a habit's sessions or daily rollup.
+
+rows() runs one query and hands back its cursor; the writers below turn
+that cursor into chunks of CSV, NDJSON or Parquet bytes, reading
+EXPORT_BATCH rows at a time, so memory stays flat however big the table
+is. Parquet needs pyarrow; the other formats only use the standard
+library, and PARQUET_ENABLED says whether it's available.
+"""
+import csv
+import io
+import json
+
+import habits
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional
+    pa = pq = None
+
+PARQUET_ENABLED = pa is not None
+
+EXPORT_BATCH = 5000  # rows per fetch (and per Parquet row group)
+KINDS = ('sessions', 'daily')
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+def columns(habit, kind):
+    """Exported column names, in order."""
+    if kind == 'daily':
+        return ('date', habit.value_column, 'sessions')
+    return ('id',) + habit.columns
+
+def rows(c, habit, kind, start=None, end=None, filters=None):
+    """Execute the export query on cursor c and return it, unfetched.
+
+    Sessions come out by date, then id; the date index supplies the order,
+    so SQLite only sorts within each day rather than the whole table.
+    filters (a habits.SessionFilter) keeps the matching sessions, or sums
+    only those into the daily totals.
+    """
+    conditions, params = [], []
+    if kind == 'daily':
+        table, params = habits.totals_source(habit, 'day', filters)
+        order = 'date'
+    else:
+        table, order = habit.sessions, 'date, id'
+        if filters is not None:
+            condition, params = filters.condition()
+            conditions.append(condition)
+    if start is not None:
+        conditions.append('date >= ?')
+        params.append(start)
+    if end is not None:
+        conditions.append('date <= ?')
+        params.append(end)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    if kind == 'daily':
+        select = columns(habit, kind)
+    else:
+        # The lookup columns are stored as ids; export their names
+        select = ('id',) + tuple(f'{sql} AS {column}' if sql != column else column
+                                 for sql, column in zip(habits.named_columns(habit), habit.columns))
+    c.execute(f'''
+        SELECT {', '.join(select)}
+        FROM {table}
+        {where}
+        ORDER BY {order}
+    ''', params)
+    return c
+
+def batches(cursor):
+    while True:
+        batch = cursor.fetchmany(EXPORT_BATCH)
+        if not batch:
+            return
+        yield batch
+
+def csv_chunks(cursor, names):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(names)
+    for batch in batches(cursor):
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()  # header of an empty export
+
+def ndjson_chunks(cursor, names):
+    for batch in batches(cursor):
+        yield ''.join(json.dumps(dict(zip(names, row))) + '\n' for row in batch)
+
+class _Sink(io.RawIOBase):
+    """Write-only file that hands out what was written since the last drain."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+def parquet_schema(habit, kind):
+    fields = []
+    for name in columns(habit, kind):
+        if name in ('id', 'sessions'):
+            fields.append(pa.field(name, pa.int64()))
+        elif name == habit.value_column:
+            fields.append(pa.field(name, pa.float64()))
+        else:
+            fields.append(pa.field(name, pa.string()))
+    return pa.schema(fields)
+
+def parquet_chunks(cursor, names, schema):
+    """One row group per batch; the footer goes out when the cursor runs dry."""
+    sink = _Sink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for batch in batches(cursor):
+            writer.write_table(pa.Table.from_pydict(
+                {name: list(values) for name, values in zip(names, zip(*batch))}, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
@@ -0,0 +1,1461 @@
+"""Habit registry and the dashboard engine shared by every habit.
+
+Each habit keeps its rows in its own SQLite file. The app's connection pool
+attaches every file under the habit's name, so the queries here are
+schema-qualified ("study.study_sessions", "sleep.daily_totals", ...) and one
+connection serves all habits.
+
+A habit's table holds one row per logged session (or budget entry) with a
+date, an optional HH:MM time, one numeric value column that the dashboard
+sums, and one category column it breaks the totals down by. The category
+(and the location, where there is one) is stored as an integer id into a
+small lookup table of names, e.g. study.topics, and each habit keeps the
+id <-> name map of those tables in memory (habit.name_maps), so queries
+group on integers and only the few grouped rows that come back get names.
+daily_totals is the per-day rollup of the value column, kept in step on
+every insert. Habits with a time also store its hour and minute of day as
+integers, parsed once on insert, and keep two histograms in step the same
+way: hourly_totals (24 buckets) and weekday_hourly_totals (7x24, Monday =
+0). Every row also carries natural_key, a 64-bit hash of its columns, so
+imports can skip rows that are already there.
+"""
+import hashlib
+import math
+import os
+import re
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+from functools import cached_property
+
+import analytics
+import heatmap
+from cache import LRUCache, NameMap, WatermarkCache
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+class Habit:
+    """One tracked habit: where its rows live and how its dashboard reads them.
+
+    columns are a session's fields after id, in insert order; posted rows use
+    the same names. The table stores the ones in lookups as <column>_id
+    (see stored_columns). value_key and category_key name the value and
+    category in the JSON, calendar_key the list of categories in each
+    heatmap cell.
+    Streak days have at least streak_threshold (or at most, when
+    streak_at_least is False). intensity_levels are the three calendar
+    bucket boundaries; values below the first (or equal to it, when
+    intensity_inclusive) are level 1, values past the last are level 4.
+    With clamp_remaining, the goal's remaining amount stops at 0 once the
+    week's goal is met instead of going negative.
+    """
+
+    def __init__(self, name, label, database, templates, table, columns,
+                 value_column, category_column, weekly_goal,
+                 streak_threshold, streak_at_least=True,
+                 value_key='hours', category_key=None, balance_key=None, calendar_key=None,
+                 intensity_levels=(2, 4, 6), intensity_inclusive=False,
+                 max_value=24, daily_days=None, clamp_remaining=False):
+        self.name = name
+        self.label = label
+        self.database = database
+        self.templates = templates
+        self.table = table
+        self.columns = columns
+        self.value_column = value_column
+        self.category_column = category_column
+        self.has_time = 'time' in columns
+        self.weekly_goal = weekly_goal
+        self.streak_threshold = streak_threshold
+        self.streak_at_least = streak_at_least
+        self.value_key = value_key
+        self.category_key = category_key or category_column
+        self.balance_key = balance_key or f'{self.category_key}Balance'
+        self.calendar_key = calendar_key
+        self.intensity_levels = intensity_levels
+        self.intensity_inclusive = intensity_inclusive
+        self.max_value = max_value
+        self.daily_days = daily_days  # trim dailyData to the last N days (None keeps all)
+        self.clamp_remaining = clamp_remaining
+
+        # Schema-qualified names on the shared, attached connection
+        self.sessions = f'{name}.{table}'
+        self.totals = f'{name}.daily_totals'
+        # daily_totals and the rollups above it, by granularity (see PERIODS)
+        self.rollups = {
+            'day': self.totals,
+            'week': f'{name}.weekly_totals',
+            'month': f'{name}.monthly_totals',
+            'year': f'{name}.yearly_totals',
+        }
+        self.hourly = f'{name}.hourly_totals'
+        self.weekday_hourly = f'{name}.weekday_hourly_totals'
+        # Columns routes can filter on, by query parameter (e.g. ?topic=&location=), and the
+        # lookup table giving each of their names an id, stored per row as <column>_id
+        self.filters = {self.category_key: category_column}
+        self.lookups = {category_column: f'{name}.{calendar_key}'}
+        if 'location' in columns:
+            self.filters['location'] = 'location'
+            self.lookups['location'] = f'{name}.locations'
+        self.name_maps = {column: NameMap(lookup) for column, lookup in self.lookups.items()}
+        # What an insert writes: columns (lookup columns as their ids), plus the hour
+        # and minute of day parsed from time
+        self.stored_columns = tuple(f'{column}_id' if column in self.lookups else column for column in columns)
+        self.stored_columns += ('hour', 'minute_of_day') if self.has_time else ()
+
+        self.streak_cache = WatermarkCache()
+        self.calendar_cache = LRUCache(maxsize=16)
+
+    def __repr__(self):
+        return f'<Habit {self.name}>'
+
+HABITS = [
+    Habit('study', 'Study session',
+          database=os.path.join(ROOT, 'studying.db'),
+          templates=os.path.join(ROOT, 'templates'),
+          table='study_sessions',
+          columns=('date', 'time', 'hours', 'topic', 'location'),
+          value_column='hours', category_column='topic',
+          weekly_goal=28,  # Updated to 28 hours per week
+          streak_threshold=4,  # Minimum hours required to count as a study day
+          calendar_key='topics'),
+    Habit('sleep', 'Sleep session',
+          database=os.path.join(ROOT, 'sleeping', 'sleeping.db'),
+          templates=os.path.join(ROOT, 'sleeping', 'templates'),
+          table='sleep_sessions',
+          columns=('date', 'time', 'hours', 'quality', 'location'),
+          value_column='hours', category_column='quality',
+          weekly_goal=49,  # 7 hours per day * 7 days
+          streak_threshold=6,  # Minimum hours required to count as a good sleep day
+          calendar_key='qualities', intensity_levels=(6, 7, 8)),
+    Habit('sports', 'Sports session',
+          database=os.path.join(ROOT, 'sports', 'sports.db'),
+          templates=os.path.join(ROOT, 'sports', 'templates'),
+          table='sports_sessions',
+          columns=('date', 'time', 'duration', 'activity', 'location'),
+          value_column='duration', category_column='activity',
+          weekly_goal=10,  # Weekly goal in hours
+          streak_threshold=0.5,  # Minimum duration (30 minutes) required to count as an active day
+          calendar_key='activities', clamp_remaining=True),
+    Habit('budget', 'Budget entry',
+          database=os.path.join(ROOT, 'budget', 'budget.db'),
+          templates=os.path.join(ROOT, 'budget', 'templates'),
+          table='budget_entries',
+          columns=('date', 'amount', 'category', 'description'),
+          value_column='amount', category_column='category',
+          weekly_goal=500,  # Weekly budget goal in dollars
+          streak_threshold=100, streak_at_least=False,  # Maximum amount to count as a good budget day
+          value_key='amount', calendar_key='categories',
+          intensity_levels=(25, 50, 75), intensity_inclusive=True,
+          max_value=None, daily_days=30),
+]
+
+REGISTRY = {habit.name: habit for habit in HABITS}
+
+def get_current_week_range():
+    today = datetime.combine(date.today(), datetime.min.time())
+    start_of_week = today - timedelta(days=today.weekday())
+    end_of_week = start_of_week + timedelta(days=6)
+    return start_of_week.strftime('%Y-%m-%d'), end_of_week.strftime('%Y-%m-%d')
+
+def get_last_week_range():
+    today = datetime.combine(date.today(), datetime.min.time())
+    start_of_week = today - timedelta(days=today.weekday())
+    last_week_start = start_of_week - timedelta(days=7)
+    last_week_end = start_of_week - timedelta(days=1)
+    return last_week_start.strftime('%Y-%m-%d'), last_week_end.strftime('%Y-%m-%d')
+
+# ========== Database Initialization ==========
+def init_db(conn, habit):
+    """Create the habit's tables, apply its migrations and check its rollup."""
+    c = conn.cursor()
+    columns = ',\n            '.join(
+        f'{column} {"REAL" if column == habit.value_column else "TEXT"}' for column in habit.columns)
+    c.execute(f'''
+        CREATE TABLE IF NOT EXISTS {habit.sessions} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            {columns}
+        )
+    ''')
+    c.execute(f'''
+        CREATE TABLE IF NOT EXISTS {habit.totals} (
+            date TEXT PRIMARY KEY,
+            {habit.value_column} REAL NOT NULL DEFAULT 0,
+            sessions INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    conn.commit()
+    run_migrations(conn, habit)
+
+    # Rebuild the rollups if rows were written behind the app's back (e.g. seed.py)
+    c.execute(f'''
+        SELECT (SELECT COUNT(*) FROM {habit.sessions}),
+               (SELECT COALESCE(SUM(sessions), 0) FROM {habit.totals}),
+               (SELECT COALESCE(SUM(sessions), 0) FROM {habit.rollups['year']})
+    ''')
+    session_count, daily_count, yearly_count = c.fetchone()
+    if not session_count == daily_count == yearly_count:
+        rebuild_rollups(conn, habit)
+
+# ========== Schema Migrations ==========
+def migrations(habit):
+    """Schema versions for one habit's database, oldest first.
+
+    run_migrations applies the ones newer than the database's user_version.
+    Append new versions, never edit released ones.
+    """
+    schema, table = habit.name, habit.table
+    value, category = habit.value_column, habit.category_column
+    # 1: covering indexes for the date-range, category and hourly queries
+    first = [
+        f'CREATE INDEX IF NOT EXISTS {schema}.idx_{table}_date_{value} ON {table} (date, {value})',
+        f'CREATE INDEX IF NOT EXISTS {schema}.idx_{table}_date_{category}_{value} '
+        f'ON {table} (date, {category}, {value})',
+    ]
+    if habit.has_time:
+        first += [
+            # Hour of day as an indexable column (virtual, so existing inserts need no change)
+            f'''ALTER TABLE {schema}.{table}
+                ADD COLUMN hour INTEGER GENERATED ALWAYS AS (CAST(substr(time, 1, 2) AS INTEGER)) VIRTUAL''',
+            f'CREATE INDEX IF NOT EXISTS {schema}.idx_{table}_hour_{value} ON {table} (hour, {value})',
+        ]
+    # 2: hour and minute of day stored on insert (bad times stay NULL instead of
+    #    breaking the hourly query), the hour histograms, and indexes for the
+    #    date/category-filtered hourly query
+    second = []
+    if habit.has_time:
+        second = [
+            f'DROP INDEX IF EXISTS {schema}.idx_{table}_hour_{value}',
+            f'ALTER TABLE {schema}.{table} DROP COLUMN hour',
+            f'ALTER TABLE {schema}.{table} ADD COLUMN hour INTEGER',
+            f'ALTER TABLE {schema}.{table} ADD COLUMN minute_of_day INTEGER',
+            backfill_hours_sql(habit),
+            f'''CREATE TABLE IF NOT EXISTS {schema}.hourly_totals (
+                hour INTEGER PRIMARY KEY,
+                {value} REAL NOT NULL DEFAULT 0,
+                sessions INTEGER NOT NULL DEFAULT 0
+            )''',
+            f'''CREATE TABLE IF NOT EXISTS {schema}.weekday_hourly_totals (
+                weekday INTEGER NOT NULL,
+                hour INTEGER NOT NULL,
+                {value} REAL NOT NULL DEFAULT 0,
+                sessions INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (weekday, hour)
+            ) WITHOUT ROWID''',
+            *rebuild_hourly_totals_sql(habit),
+            f'CREATE INDEX IF NOT EXISTS {schema}.idx_{table}_date_hour_{value} ON {table} (date, hour, {value})',
+            f'CREATE INDEX IF NOT EXISTS {schema}.idx_{table}_{category}_date_hour '
+            f'ON {table} ({category}, date, hour, {value})',
+        ]
+    # 3: natural-key hash of each row's columns, for deduplicating imports
+    third = [
+        f'ALTER TABLE {schema}.{table} ADD COLUMN natural_key INTEGER',
+        f'UPDATE {schema}.{table} SET natural_key = natural_key({", ".join(habit.columns)})',
+        f'CREATE INDEX IF NOT EXISTS {schema}.idx_{table}_natural_key ON {table} (natural_key)',
+    ]
+    # 4: week, month and year rollups of daily_totals, for all-time series
+    fourth = [
+        f'''CREATE TABLE IF NOT EXISTS {habit.rollups[period]} (
+            date TEXT PRIMARY KEY,
+            {value} REAL NOT NULL DEFAULT 0,
+            sessions INTEGER NOT NULL DEFAULT 0
+        )''' for period in PERIODS
+    ] + rebuild_period_totals_sql(habit)
+    # 5: lookup tables for the filterable columns, each row's ids into them, and
+    #    (id, date[, hour], value) indexes for the filtered series
+    fifth = []
+    for column, lookup in habit.lookups.items():
+        fifth += [
+            f'''CREATE TABLE IF NOT EXISTS {lookup} (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE
+            )''',
+            f'ALTER TABLE {schema}.{table} ADD COLUMN {column}_id INTEGER',
+        ]
+        hour = 'hour, ' if habit.has_time else ''
+        fifth.append(f'CREATE INDEX IF NOT EXISTS {schema}.idx_{table}_{column}_id_date '
+                     f'ON {table} ({column}_id, date, {hour}{value})')
+    fifth += backfill_lookups_sql(habit)
+    # 6: the lookup columns' text dropped, leaving only the ids; the indexes on the
+    #    category's text make way for a (date, <category>_id, value) one
+    sixth = [f'DROP INDEX IF EXISTS {schema}.idx_{table}_date_{category}_{value}']
+    if habit.has_time:
+        sixth.append(f'DROP INDEX IF EXISTS {schema}.idx_{table}_{category}_date_hour')
+    sixth.append(f'CREATE INDEX IF NOT EXISTS {schema}.idx_{table}_date_{category}_id_{value} '
+                 f'ON {table} (date, {category}_id, {value})')
+    sixth += [f'ALTER TABLE {schema}.{table} DROP COLUMN {column}' for column in habit.lookups]
+    return [first, second, third, fourth, fifth, sixth]
+
+def run_migrations(conn, habit):
+    """Apply the habit's pending migrations in order, one transaction per version."""
+    register_functions(conn)
+    c = conn.cursor()
+    version = c.execute(f'PRAGMA {habit.name}.user_version').fetchone()[0]
+    pending = migrations(habit)[version:]
+    for number, statements in enumerate(pending, start=version + 1):
+        c.execute('BEGIN')
+        for statement in statements:
+            c.execute(statement)
+        c.execute(f'PRAGMA {habit.name}.user_version = {number}')
+        conn.commit()
+    if pending:
+        # Refresh planner statistics so the new indexes are picked up
+        c.execute(f'ANALYZE {habit.name}')
+        conn.commit()
+
+# ========== Natural Keys ==========
+def natural_key(*values):
+    """Signed 64-bit hash of a row's column values, in habit.columns order.
+
+    Values are hashed by their text, with floats in repr form, so the same
+    session hashes alike whether it came from JSON, CSV or SQLite.
+    """
+    text = '\x1f'.join('' if value is None else repr(float(value)) if isinstance(value, (int, float))
+                        else str(value) for value in values)
+    digest = hashlib.blake2b(text.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+def register_functions(conn):
+    """Make natural_key() callable from SQL on conn (migrations and backfills use it)."""
+    conn.create_function('natural_key', -1, natural_key, deterministic=True)
+
+# ========== Lookups ==========
+def named_columns(habit):
+    """SQL for habit.columns on the sessions table, the lookup columns read back as names."""
+    return [f'(SELECT name FROM {habit.lookups[column]} WHERE id = {column}_id)' if column in habit.lookups
+            else column for column in habit.columns]
+
+def category_names(c, habit, ids):
+    """{id: name} for category ids, from the habit's cached map."""
+    return habit.name_maps[habit.category_column].names(c, ids)
+
+def split_ids(text):
+    """The ids in a GROUP_CONCAT of integer ids ('3,1' -> [3, 1], NULL -> [])."""
+    return [int(id_) for id_ in text.split(',')] if text else []
+
+# ========== Rollups ==========
+# SQLite's %w counts from Sunday; the dashboard's weeks start on Monday
+WEEKDAY_SQL = "(CAST(strftime('%w', date) AS INTEGER) + 6) % 7"
+
+# The rollups above daily_totals (habit.rollups), keyed by the first day of
+# each period: (SQL for the first day of a date's period, the rollup it's
+# rebuilt from). Years are summed from months; weeks straddle months, so
+# they're summed from days.
+PERIODS = {
+    'week': (f"date(date, '-' || ({WEEKDAY_SQL}) || ' days')", 'day'),
+    'month': ("substr(date, 1, 7) || '-01'", 'day'),
+    'year': ("substr(date, 1, 4) || '-01-01'", 'month'),
+}
+
+def period_start(day, period):
+    """First day of the period ('day', 'week', 'month' or 'year') that contains day (a date)."""
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    if period == 'month':
+        return day.replace(day=1)
+    if period == 'year':
+        return day.replace(month=1, day=1)
+    return day
+
+def rebuild_rollups(conn, habit):
+    """Recompute daily_totals, the period rollups (and the hour histograms) from the raw rows.
+
+    Rows written without the derived columns (e.g. by seed_synthetic.py)
+    get them filled in first.
+    """
+    register_functions(conn)
+    c = conn.cursor()
+    c.execute(f'''
+        UPDATE {habit.sessions} SET natural_key = natural_key({', '.join(named_columns(habit))})
+        WHERE natural_key IS NULL
+    ''')
+    rebuild_daily_totals(c, habit)
+    for statement in rebuild_period_totals_sql(habit):
+        c.execute(statement)
+    if habit.has_time:
+        c.execute(backfill_hours_sql(habit) + ' AND hour IS NULL')
+        for statement in rebuild_hourly_totals_sql(habit):
+            c.execute(statement)
+    conn.commit()
+
+def rebuild_daily_totals(c, habit):
+    """Recompute daily_totals from the raw rows in one pass."""
+    c.execute(f'DELETE FROM {habit.totals}')
+    c.execute(f'''
+        INSERT INTO {habit.totals} (date, {habit.value_column}, sessions)
+        SELECT date, SUM({habit.value_column}), COUNT(*)
+        FROM {habit.sessions}
+        GROUP BY date
+    ''')
+
+def rebuild_period_totals_sql(habit):
+    """Statements that recompute the week, month and year rollups from the finer ones."""
+    value = habit.value_column
+    statements = []
+    for period, (bucket, source) in PERIODS.items():
+        statements += [
+            f'DELETE FROM {habit.rollups[period]}',
+            f'''INSERT INTO {habit.rollups[period]} (date, {value}, sessions)
+            SELECT {bucket}, SUM({value}), SUM(sessions)
+            FROM {habit.rollups[source]}
+            GROUP BY 1''',
+        ]
+    return statements
+
+def backfill_lookups_sql(habit):
+    """Statements that give every row without lookup ids its ids, adding missing names.
+
+    Migration 5 only: they read the text columns migration 6 drops.
+    """
+    statements = []
+    for column, lookup in habit.lookups.items():
+        statements += [
+            f'''INSERT OR IGNORE INTO {lookup} (name)
+            SELECT DISTINCT {column} FROM {habit.sessions}
+            WHERE {column}_id IS NULL AND {column} IS NOT NULL
+            ORDER BY {column}''',
+            f'''UPDATE {habit.sessions}
+            SET {column}_id = (SELECT id FROM {lookup} WHERE name = {column})
+            WHERE {column}_id IS NULL AND {column} IS NOT NULL''',
+        ]
+    return statements
+
+def backfill_hours_sql(habit):
+    """UPDATE that parses hour and minute_of_day out of every well-formed HH:MM time."""
+    return f'''
+        UPDATE {habit.sessions}
+        SET hour = CAST(substr(time, 1, 2) AS INTEGER),
+            minute_of_day = CAST(substr(time, 1, 2) AS INTEGER) * 60 + CAST(substr(time, 4, 2) AS INTEGER)
+        WHERE time GLOB '[0-2][0-9]:[0-5][0-9]*' AND substr(time, 1, 2) < '24'
+    '''
+
+def rebuild_hourly_totals_sql(habit):
+    """Statements that recompute both hour histograms from the stored hours."""
+    value = habit.value_column
+    return [
+        f'DELETE FROM {habit.hourly}',
+        f'''INSERT INTO {habit.hourly} (hour, {value}, sessions)
+            SELECT hour, SUM({value}), COUNT(*)
+            FROM {habit.sessions}
+            WHERE hour IS NOT NULL
+            GROUP BY hour''',
+        f'DELETE FROM {habit.weekday_hourly}',
+        f'''INSERT INTO {habit.weekday_hourly} (weekday, hour, {value}, sessions)
+            SELECT {WEEKDAY_SQL} AS weekday, hour, SUM({value}), COUNT(*)
+            FROM {habit.sessions}
+            WHERE hour IS NOT NULL AND weekday IS NOT NULL
+            GROUP BY weekday, hour''',
+    ]
+
+def update_daily_totals(c, habit, totals):
+    """Add {date: [value, sessions]} to daily_totals and the period rollups, one upsert per date and period."""
+    value = habit.value_column
+    for period, table in habit.rollups.items():
+        period_totals = {}
+        for date_str, (total, sessions) in totals.items():
+            key = period_start(date.fromisoformat(date_str), period).isoformat() if period != 'day' else date_str
+            bucket = period_totals.setdefault(key, [0, 0])
+            bucket[0] += total
+            bucket[1] += sessions
+        c.executemany(f'''
+            INSERT INTO {table} (date, {value}, sessions)
+            VALUES (?, ?, ?)
+            ON CONFLICT(date) DO UPDATE SET
+                {value} = {value} + excluded.{value},
+                sessions = sessions + excluded.sessions
+        ''', [(key, total, sessions) for key, (total, sessions) in period_totals.items()])
+
+def update_hourly_totals(c, habit, hourly, weekday_hourly):
+    """Add {hour: [value, sessions]} and {(weekday, hour): [value, sessions]} to the histograms."""
+    value = habit.value_column
+    c.executemany(f'''
+        INSERT INTO {habit.hourly} (hour, {value}, sessions)
+        VALUES (?, ?, ?)
+        ON CONFLICT(hour) DO UPDATE SET
+            {value} = {value} + excluded.{value},
+            sessions = sessions + excluded.sessions
+    ''', [(hour, total, sessions) for hour, (total, sessions) in hourly.items()])
+    c.executemany(f'''
+        INSERT INTO {habit.weekday_hourly} (weekday, hour, {value}, sessions)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(weekday, hour) DO UPDATE SET
+            {value} = {value} + excluded.{value},
+            sessions = sessions + excluded.sessions
+    ''', [(weekday, hour, total, sessions)
+          for (weekday, hour), (total, sessions) in weekday_hourly.items()])
+
+def fold_rollups_since(c, habit, watermark):
+    """Add the rows with id > watermark to the rollups, set-based.
+
+    For bulk loads: one GROUP BY over the new rows (a rowid range) instead
+    of per-row bookkeeping. AUTOINCREMENT ids only grow, so the new rows
+    are exactly those above the highest id seen before the load.
+    """
+    value = habit.value_column
+    # (rollup, its key, what the key is selected as, what it's grouped by, extra condition)
+    upserts = [(habit.totals, 'date', 'date', 'date', '')]
+    upserts += [(habit.rollups[period], 'date', bucket, '1', '') for period, (bucket, _) in PERIODS.items()]
+    if habit.has_time:
+        upserts += [
+            (habit.hourly, 'hour', 'hour', 'hour', ' AND hour IS NOT NULL'),
+            (habit.weekday_hourly, 'weekday, hour', f'{WEEKDAY_SQL} AS weekday, hour', 'weekday, hour',
+             ' AND hour IS NOT NULL AND weekday IS NOT NULL'),
+        ]
+    for table, key, select, group, condition in upserts:
+        c.execute(f'''
+            INSERT INTO {table} ({key}, {value}, sessions)
+            SELECT {select}, SUM({value}), COUNT(*)
+            FROM {habit.sessions}
+            WHERE id > ?{condition}
+            GROUP BY {group}
+            ON CONFLICT({key}) DO UPDATE SET
+                {value} = {value} + excluded.{value},
+                sessions = sessions + excluded.sessions
+        ''', (watermark,))
+
+# ========== Moving Averages and Streaks ==========
+DEFAULT_WINDOWS = (7,)
+MAX_WINDOW = 365
+
+def parse_windows(arg):
+    """Parse a ?windows=7,30 query value into a tuple of distinct window sizes."""
+    if not arg:
+        return DEFAULT_WINDOWS
+    windows = []
+    for part in arg.split(','):
+        try:
+            window = int(part)
+        except ValueError:
+            raise ValueError(f"invalid window {part!r}")
+        if not 1 <= window <= MAX_WINDOW:
+            raise ValueError(f"window must be between 1 and {MAX_WINDOW}, got {window}")
+        if window not in windows:
+            windows.append(window)
+    return tuple(windows)
+
+def calculate_moving_averages(data, windows=DEFAULT_WINDOWS, fill_gaps=False, key='hours'):
+    """Trailing moving averages for several windows in a single pass.
+
+    Keeps one running sum per window, so the cost is O(len(data) * len(windows))
+    regardless of window size. With fill_gaps, calendar days missing from data
+    count as zero and get their own point; otherwise windows span rows, not days.
+    Returns {window: [{'date': ..., key: ...}, ...]}.
+    """
+    result = {window: [] for window in windows}
+    if not data:
+        return result
+
+    series = [(d['date'], d[key]) for d in data]
+    if fill_gaps:
+        filled = []
+        previous = None
+        for date_str, value in series:
+            day = date.fromisoformat(date_str)
+            if previous is not None:
+                for offset in range(1, (day - previous).days):
+                    filled.append(((previous + timedelta(days=offset)).isoformat(), 0))
+            filled.append((date_str, value))
+            previous = day
+        series = filled
+
+    values = []
+    sums = dict.fromkeys(windows, 0.0)
+    for i, (date_str, value) in enumerate(series):
+        values.append(value)
+        for window in windows:
+            sums[window] += value
+            if i >= window:
+                sums[window] -= values[i - window]
+            avg = sums[window] / min(i + 1, window)
+            result[window].append({'date': date_str, key: round(avg, 2)})
+    return result
+
+def calculate_streaks(habit, daily_data, series=None):
+    """Current and longest runs of qualifying days, plus every run's dates.
+
+    Works on day ordinals in one pass; pass a DailySeries to use the
+    vectorized backend instead.
+    """
+    threshold = habit.streak_threshold
+    if series is not None:
+        runs = series.streak_runs(threshold, habit.streak_at_least)
+    elif habit.streak_at_least:
+        runs = analytics.streak_runs(daily_data, lambda value: value >= threshold, key=habit.value_key)
+    else:
+        runs = analytics.streak_runs(daily_data, lambda value: value <= threshold, key=habit.value_key)
+    current, longest = analytics.summarize_streaks(runs)
+    limit = 'minimum' if habit.streak_at_least else 'maximum'
+    return {
+        'current': current,
+        'longest': longest,
+        f'{limit}{habit.value_key.capitalize()}': threshold,
+        'history': analytics.streak_history(runs)
+    }
+
+# ========== Filters ==========
+class SessionFilter:
+    """The sessions a route looks at: ?topic=math,ml&location=library.
+
+    values maps filtered columns to the names asked for; a session matches
+    if each of those columns holds one of its names. Names are matched
+    through the lookup tables, so the condition is on the <column>_id
+    indexes, and filtered totals are summed from the sessions instead of
+    read from the rollups.
+    """
+
+    def __init__(self, habit, values):
+        self.habit = habit
+        self.values = values
+
+    @property
+    def key(self):
+        """Hashable form, for cache keys."""
+        return tuple(sorted((column, tuple(sorted(names))) for column, names in self.values.items()))
+
+    def condition(self):
+        """(SQL condition on the sessions table, params)."""
+        conditions, params = [], []
+        for column, names in self.values.items():
+            conditions.append(f"{column}_id IN (SELECT id FROM {self.habit.lookups[column]} "
+                              f"WHERE name IN ({', '.join('?' * len(names))}))")
+            params += names
+        return ' AND '.join(conditions), params
+
+def parse_filters(habit, args):
+    """SessionFilter from the request args (None without filters).
+
+    Each of habit.filters' parameters may be repeated or hold several
+    comma-separated names: ?topic=math,ml or ?topic=math&topic=ml.
+    """
+    values = {}
+    for param, column in habit.filters.items():
+        names = []
+        for arg in args.getlist(param):
+            names += [name.strip() for name in arg.split(',') if name.strip() and name.strip() not in names]
+        if names:
+            values[column] = names
+    return SessionFilter(habit, values) if values else None
+
+def totals_source(habit, granularity='day', filters=None):
+    """(table or subquery, params) with date, value and sessions per period.
+
+    Unfiltered that's the rollup itself; filtered, the matching sessions
+    summed per period.
+    """
+    if filters is None:
+        return habit.rollups[granularity], []
+    value = habit.value_column
+    bucket = PERIODS[granularity][0] if granularity != 'day' else 'date'
+    condition, params = filters.condition()
+    return f'''(
+            SELECT {bucket} AS date, SUM({value}) AS {value}, COUNT(*) AS sessions
+            FROM {habit.sessions}
+            WHERE {condition}
+            GROUP BY 1
+        )''', params
+
+# ========== Date Ranges ==========
+GRANULARITIES = ('day', *PERIODS)
+
+class DailyRange:
+    """The part of the daily series a data route returns: ?from=&to=&granularity=.
+
+    start and end are 'YYYY-MM-DD' or None. Weeks, months and years are read
+    from their rollups, whole: start moves back to the first day of its
+    period, and a period is in the range if it starts by end. seed is how
+    many points before start the moving averages need (their longest
+    window - 1). Those are read in the same statement as the range, so the
+    averages at the start of the range come out as they would over the
+    whole history. Raises ValueError for an unknown granularity, or for
+    fill_gaps with anything but days.
+    """
+
+    def __init__(self, start=None, end=None, granularity='day', fill_gaps=False):
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+        if fill_gaps and granularity != 'day':
+            raise ValueError('fillGaps only works with granularity=day')
+        self.start = period_start(date.fromisoformat(start), granularity).isoformat() if start else None
+        self.end = end
+        self.granularity = granularity
+        self.fill_gaps = fill_gaps
+        self.seed = 0
+        self.pinned = frozenset()  # the days series() added as zeros
+
+    @property
+    def everything(self):
+        """True when the whole series is asked for, day by day."""
+        return self.start is None and self.end is None and self.granularity == 'day'
+
+    def branches(self, habit, filters=None):
+        """(UNION branches, params) for fetch_dashboard_rows, tagged 'range' (and 'edge')."""
+        value = habit.value_column
+        table, table_params = totals_source(habit, self.granularity, filters)
+        branches, params = [], []
+        lower = self.start
+        if self.start is not None and self.seed:
+            if self.fill_gaps:
+                # Missing days count as zeros, so the seed is a run of calendar days
+                lower = self.lower
+            else:
+                # Windows span rows: the last seed points before start, however old
+                branches.append(f'''
+        SELECT * FROM (
+            SELECT 'range', date, {value}
+            FROM {table}
+            WHERE date < ?
+            ORDER BY date DESC
+            LIMIT {self.seed}
+        )''')
+                params += table_params + [self.start]
+
+        conditions, range_params = [], []
+        if lower is not None:
+            conditions.append('date >= ?')
+            range_params.append(lower)
+        if self.end is not None:
+            conditions.append('date <= ?')
+            range_params.append(self.end)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        branches.append(f'''
+        SELECT 'range', date, {value}
+        FROM {table}
+        {where}''')
+        params += table_params + range_params
+        if self.fill_gaps:
+            # Is there anything past either end? Then the full series would run through
+            # the gap days at that end, which have to be counted as zeros too.
+            if lower is not None:
+                branches.append(f'''
+        SELECT 'edge', 'before', MAX(date)
+        FROM {table}
+        WHERE date < ?''')
+                params += table_params + [lower]
+            if self.end is not None:
+                branches.append(f'''
+        SELECT 'edge', 'after', MIN(date)
+        FROM {table}
+        WHERE date > ?''')
+                params += table_params + [self.end]
+        return branches, params
+
+    @property
+    def lower(self):
+        """The first day read: start, or the start of the seed with fill_gaps."""
+        if self.start is None or not (self.fill_gaps and self.seed):
+            return self.start
+        return (date.fromisoformat(self.start) - timedelta(days=self.seed)).isoformat()
+
+    def series(self, rows, edges, key):
+        """The sorted range points (seed included) from the 'range' rows.
+
+        edges holds the 'edge' rows: {'before': ..., 'after': ...}, set when
+        there are days outside the range. Then a zero day may be added at
+        either end, so gap filling runs through to it; those are in pinned.
+        """
+        points = sorted(rows)
+        before, after = edges.get('before') is not None, edges.get('after') is not None
+        pinned = []
+        # The full series only spans an end if it has days on both sides of it
+        if before and (points or after) and (not points or points[0][0] != self.lower):
+            points.insert(0, (self.lower, 0))
+            pinned.append(self.lower)
+        if after and points and points[-1][0] != self.end:
+            points.append((self.end, 0))
+            pinned.append(self.end)
+        self.pinned = frozenset(pinned)
+        return [{'date': day, key: total} for day, total in points]
+
+    def trim(self, points):
+        """points from start on, i.e. without the seed."""
+        if self.start is None:
+            return points
+        return points[bisect_left([p['date'] for p in points], self.start):]
+
+    def days(self, points):
+        """trim(points) without the pinned zero days: the range's own rows."""
+        return [point for point in self.trim(points) if point['date'] not in self.pinned]
+
+# ========== Series ==========
+def get_series(c, habit, daily_range, filters=None):
+    """Total and session count per day, week, month or year of daily_range, from its rollup.
+
+    One indexed read of the rollup, so an all-time series by month costs as
+    many rows as there are months, however many sessions they hold. With
+    filters (a SessionFilter) the matching sessions are summed instead.
+    """
+    value = habit.value_column
+    table, params = totals_source(habit, daily_range.granularity, filters)
+    conditions = []
+    if daily_range.start is not None:
+        conditions.append('date >= ?')
+        params.append(daily_range.start)
+    if daily_range.end is not None:
+        conditions.append('date <= ?')
+        params.append(daily_range.end)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    c.execute(f'''
+        SELECT date, {value}, sessions
+        FROM {table}
+        {where}
+        ORDER BY date
+    ''', params)
+    return [{'date': day, habit.value_key: total, 'sessions': sessions} for day, total, sessions in c.fetchall()]
+
+# ========== Dashboard ==========
+# What fetch_dashboard_rows can read, one UNION branch (or a few) each
+DASHBOARD_SOURCES = ('day', 'chart', 'category', 'hour', 'watermark')
+
+def fetch_dashboard_rows(c, habit, categories_since, sources=DASHBOARD_SOURCES, daily_range=None, filters=None):
+    """What a habit's dashboard reads from the database, in one statement.
+
+    sources picks the branches: 'day' (the daily series), 'chart' (the
+    daily_range part of it, with its seed), 'category' (totals per category
+    since categories_since, grouped by id and named from habit.name_maps),
+    'hour' (the hourly_totals histogram; habits with a time only) and
+    'watermark'. 'chart' over the whole series is
+    just 'day'. Returns (watermark, daily_data, category_data, hourly_data,
+    chart_data), with None or [] for what wasn't read; chart_data is
+    daily_data itself when they're the same. With filters (a SessionFilter)
+    every section but the watermark covers the matching sessions only, summed
+    from the sessions rather than read from the rollups. The watermark is the highest row
+    id; AUTOINCREMENT never reuses ids, so it moves on every insert, and
+    reading it in the same statement as the data means the streak cache can't
+    file a concurrent insert's result under the old id.
+    Each branch of the UNION tags its rows with the section they belong to.
+    There's no ORDER BY: sorting the compound result would go through a temp
+    b-tree over every row, so the (small) sections are sorted here instead.
+    """
+    value, category = habit.value_column, habit.category_column
+    daily_range = daily_range or DailyRange()
+    chart_is_day = 'chart' in sources and daily_range.everything
+    condition, condition_params = filters.condition() if filters is not None else ('', [])
+    branches, params = [], []
+    if 'day' in sources or chart_is_day:
+        table, table_params = totals_source(habit, 'day', filters)
+        branches.append(f'''
+        SELECT 'day', date, {value}
+        FROM {table}''')
+        params += table_params
+    if 'category' in sources:
+        branches.append(f'''
+        SELECT 'category', {category}_id, SUM({value})
+        FROM {habit.sessions}
+        WHERE date >= ?{f' AND {condition}' if condition else ''}
+        GROUP BY {category}_id''')
+        params += [categories_since] + condition_params
+    if 'hour' in sources and habit.has_time:
+        if filters is None:
+            branches.append(f'''
+        SELECT 'hour', hour, {value}
+        FROM {habit.hourly}''')
+        else:
+            branches.append(f'''
+        SELECT 'hour', hour, SUM({value})
+        FROM {habit.sessions}
+        WHERE {condition} AND hour IS NOT NULL
+        GROUP BY hour''')
+            params += condition_params
+    if 'watermark' in sources:
+        branches.append(f'''
+        SELECT 'watermark', NULL, MAX(id)
+        FROM {habit.sessions}''')
+    if 'chart' in sources and not chart_is_day:
+        range_branches, range_params = daily_range.branches(habit, filters)
+        branches += range_branches
+        params += range_params
+
+    watermark = None
+    edges = {}
+    rows = {'day': [], 'category': [], 'hour': [], 'range': []}
+    if branches:
+        c.execute('\n        UNION ALL'.join(branches), params)
+        for section, key, total in c.fetchall():
+            if section == 'watermark':
+                watermark = total
+            elif section == 'edge':
+                edges[key] = total
+            else:
+                rows[section].append((key, total or 0))
+
+    value_key = habit.value_key
+    daily_data = [{'date': day, value_key: total} for day, total in sorted(rows['day'])]
+    names = category_names(c, habit, [category_id for category_id, _ in rows['category']])
+    category_data = [{habit.category_key: names[category_id], value_key: total}
+                     for category_id, total in sorted(rows['category'], key=lambda row: row[1], reverse=True)]
+    hourly_data = [{'hour': hour, value_key: total} for hour, total in sorted(rows['hour'])]
+    if chart_is_day:
+        chart_data = daily_data
+    else:
+        chart_data = daily_range.series(rows['range'], edges, value_key)
+    return watermark, daily_data, category_data, hourly_data, chart_data
+
+def week_from_daily(daily_data, week_start, week_end, key='hours'):
+    """(daily breakdown, total) for one week, sliced out of the sorted daily series."""
+    dates = [d['date'] for d in daily_data]
+    week = daily_data[bisect_left(dates, week_start):bisect_right(dates, week_end)]
+    return week, sum(day[key] for day in week)
+
+def cached_streaks(habit, watermark, daily_data, series=None):
+    """calculate_streaks, reused until a row is added or the day rolls over."""
+    return habit.streak_cache.get(
+        (watermark, date.today()),
+        lambda: calculate_streaks(habit, daily_data, series))
+
+def weekly_progress(habit, daily_data, series=None):
+    """(weeklyComparison, goalProgress) for the current week of a daily series."""
+    key = habit.value_key
+    unit = key.capitalize()
+
+    # Get current and last week ranges
+    current_week_start, current_week_end = get_current_week_range()
+    last_week_start, last_week_end = get_last_week_range()
+
+    if series is not None:
+        current_week_daily, current_week_total = series.week(current_week_start)
+        _, last_week_total = series.week(last_week_start)
+    else:
+        # Current Week Total with daily breakdown, and Last Week Total
+        current_week_daily, current_week_total = week_from_daily(
+            daily_data, current_week_start, current_week_end, key)
+        _, last_week_total = week_from_daily(daily_data, last_week_start, last_week_end, key)
+
+    # Calculate days remaining in the week
+    today = datetime.now().date()
+    days_elapsed = (today - datetime.strptime(current_week_start, '%Y-%m-%d').date()).days + 1
+    days_remaining = 7 - days_elapsed
+
+    # Calculate average needed per remaining day
+    remaining = habit.weekly_goal - current_week_total
+    if habit.clamp_remaining:
+        remaining = max(0, remaining)
+    avg_needed = remaining / days_remaining if days_remaining > 0 else 0
+
+    # Calculate weekly change
+    weekly_change = ((current_week_total - last_week_total) / last_week_total * 100) if last_week_total > 0 else 0
+
+    weekly_comparison = {
+        'current': round(current_week_total, 1),
+        'last': round(last_week_total, 1),
+        'change': round(weekly_change, 1)
+    }
+    goal_progress = {
+        'current': round(current_week_total, 1),
+        'goal': habit.weekly_goal,
+        'percentage': min(round((current_week_total / habit.weekly_goal * 100), 1), 100),
+        'daysElapsed': days_elapsed,
+        'daysRemaining': days_remaining,
+        f'{key}Remaining': round(remaining, 1),
+        f'avg{unit}Needed': round(avg_needed, 1),
+        'dailyBreakdown': current_week_daily
+    }
+    return weekly_comparison, goal_progress
+
+class DashboardBuild:
+    """The rows and shared intermediates of one build_dashboard call.
+
+    Intermediates used by more than one section (the NumPy series, the
+    moving averages, the week's totals) are computed on first use, so they
+    run once if any of their sections is requested and not at all otherwise.
+    """
+
+    def __init__(self, habit, rows, windows, fill_gaps, daily_range, filters=None):
+        self.habit = habit
+        self.watermark, self.daily_data, self.category_data, self.hourly_data, self.chart_data = rows
+        self.windows = windows
+        self.fill_gaps = fill_gaps
+        self.daily_range = daily_range
+        self.filters = filters
+
+    @cached_property
+    def series(self):
+        """Vectorized daily series when NumPy is available, else None."""
+        return analytics.DailySeries(self.daily_data, self.habit.value_key) if analytics.ENABLED else None
+
+    @cached_property
+    def chart_series(self):
+        """series, for the range the charts show (seed included)."""
+        if self.chart_data is self.daily_data:
+            return self.series
+        return analytics.DailySeries(self.chart_data, self.habit.value_key) if analytics.ENABLED else None
+
+    @cached_property
+    def moving_averages(self):
+        """{window: points} over the range, computed with its seed and then trimmed to it."""
+        if self.chart_series is not None:
+            averages = self.chart_series.moving_averages(self.windows, self.fill_gaps)
+        else:
+            # One pass for every requested window
+            averages = calculate_moving_averages(self.chart_data, self.windows, self.fill_gaps, self.habit.value_key)
+        return {window: self.daily_range.trim(points) for window, points in averages.items()}
+
+    @cached_property
+    def weekly(self):
+        """(weeklyComparison, goalProgress): both come from the same slice of the week."""
+        return weekly_progress(self.habit, self.daily_data, self.series)
+
+def daily_section(build):
+    if not build.daily_range.everything:
+        return build.daily_range.days(build.chart_data)
+    daily_data = build.daily_data
+    if build.habit.daily_days is not None:
+        since = (date.today() - timedelta(days=build.habit.daily_days)).isoformat()
+        daily_data = daily_data[bisect_left([d['date'] for d in daily_data], since):]
+    return daily_data
+
+def balance_section(build):
+    key, category_key = build.habit.value_key, build.habit.category_key
+    # Calculate total for percentage
+    total = sum(t[key] for t in build.category_data)
+    return [{
+        category_key: t[category_key],
+        key: t[key],
+        'percentage': round((t[key] / total * 100), 1) if total else 0
+    } for t in build.category_data]
+
+def streaks_section(build):
+    if build.filters is not None:
+        # The cache holds one entry, the unfiltered habit's
+        return calculate_streaks(build.habit, build.daily_data, build.series)
+    # Streaks only change when a row is added or the day rolls over
+    return cached_streaks(build.habit, build.watermark, build.daily_data, build.series)
+
+# Every field of the data route: (sources it reads, function that builds it from
+# a DashboardBuild). 'balance' is named after the category, e.g. topicBalance.
+DASHBOARD_SECTIONS = {
+    'dailyData': (('chart',), daily_section),
+    'movingAvgData': (('chart',), lambda build: build.moving_averages[build.windows[0]]),
+    'weeklyComparison': (('day',), lambda build: build.weekly[0]),
+    'balance': (('category',), balance_section),
+    'goalProgress': (('day',), lambda build: build.weekly[1]),
+    'streaks': (('day', 'watermark'), streaks_section),
+    # Highest row id the response includes; /api/stream updates say which rows they add
+    'watermark': (('watermark',), lambda build: build.watermark or 0),
+    'hourlyData': (('hour',), lambda build: build.hourly_data),
+    'movingAverages': (('chart',), lambda build: {str(w): build.moving_averages[w] for w in build.windows}),
+}
+
+def dashboard_fields(habit):
+    """{field name: DASHBOARD_SECTIONS key} of the habit's data route, in response order."""
+    fields = {}
+    for section in DASHBOARD_SECTIONS:
+        if section == 'hourlyData' and not habit.has_time:
+            continue
+        fields[habit.balance_key if section == 'balance' else section] = section
+    return fields
+
+def parse_fields(habit, arg):
+    """Field names from ?fields=streaks,goalProgress (None when left out); raises ValueError."""
+    if not arg:
+        return None
+    available = dashboard_fields(habit)
+    fields = []
+    for part in arg.split(','):
+        field = part.strip()
+        if field not in available:
+            raise ValueError(f"unknown field {field!r}, expected some of {', '.join(available)}")
+        if field not in fields:
+            fields.append(field)
+    return tuple(fields)
+
+def build_dashboard(c, habit, windows=None, fill_gaps=False, timer=None, fields=None, daily_range=None,
+                    filters=None):
+    """The JSON body of a habit's data route.
+
+    fields (see parse_fields) limits it to those sections: the statement
+    only reads the sources they need, and other sections never run. By
+    default every field is built except movingAverages, which is only added
+    when windows are given explicitly; movingAvgData always uses the first
+    (default 7-day) window. daily_range (a DailyRange) limits dailyData and
+    the moving averages to a span of dates, optionally summed by week,
+    month or year; the week, goal and streaks still cover everything.
+    filters (a SessionFilter) limits every section to the matching sessions.
+    timer is an optional profiling.SectionTimer that gets a 'query' lap,
+    then one lap per field.
+    """
+    lap = timer.lap if timer is not None else lambda name: None
+    available = dashboard_fields(habit)
+    if fields is None:
+        fields = [field for field in available if field != 'movingAverages' or windows is not None]
+    windows = windows or DEFAULT_WINDOWS
+    sources = {source for field in fields for source in DASHBOARD_SECTIONS[available[field]][0]}
+    daily_range = daily_range or DailyRange(fill_gaps=fill_gaps)
+    if 'movingAvgData' in fields or 'movingAverages' in fields:
+        daily_range.seed = max(windows) - 1
+
+    # Everything the fields read, in one round trip; the category balance covers the last 30 days
+    thirty_days_ago = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
+    rows = fetch_dashboard_rows(c, habit, thirty_days_ago, sources, daily_range, filters)
+    build = DashboardBuild(habit, rows, windows, fill_gaps, daily_range, filters)
+    lap('query')
+
+    response_data = {}
+    for field in fields:
+        response_data[field] = DASHBOARD_SECTIONS[available[field]][1](build)
+        lap(field)
+    return response_data
+
+# ========== Overview ==========
+def fetch_overview_rows(c, habit_list):
+    """Every habit's daily series and watermark, in one statement.
+
+    Returns {habit name: (watermark, daily_data)}. Reads only the daily_totals
+    rollups (plus MAX(id) for the streak caches), so the overview never scans
+    the session tables.
+    """
+    branches = []
+    for habit in habit_list:
+        branches += [
+            f"SELECT '{habit.name}', date, {habit.value_column} FROM {habit.totals}",
+            f"SELECT '{habit.name}', NULL, MAX(id) FROM {habit.sessions}",
+        ]
+    c.execute('\nUNION ALL\n'.join(branches))
+
+    watermarks = {}
+    days = {habit.name: [] for habit in habit_list}
+    for name, day, total in c.fetchall():
+        if day is None:
+            watermarks[name] = total
+        else:
+            days[name].append((day, total or 0))
+
+    return {habit.name: (watermarks.get(habit.name), [
+        {'date': day, habit.value_key: total} for day, total in sorted(days[habit.name])
+    ]) for habit in habit_list}
+
+def build_overview(c, habit_list, timer=None):
+    """The JSON body of /api/overview: each habit's week, goal and streaks.
+
+    timer gets a 'query' lap for the shared statement, then one lap per habit.
+    Streak history is left out; the habit's own data route has it.
+    """
+    lap = timer.lap if timer is not None else lambda name: None
+    rows = fetch_overview_rows(c, habit_list)
+    lap('query')
+
+    overview = {}
+    for habit in habit_list:
+        overview[habit.name] = habit_summary(habit, *rows[habit.name])
+        lap(habit.name)
+    return overview
+
+def habit_summary(habit, watermark, daily_data):
+    """One habit's entry in the overview: week, goal progress and streaks (without history)."""
+    series = analytics.DailySeries(daily_data, habit.value_key) if analytics.ENABLED else None
+    streaks = cached_streaks(habit, watermark, daily_data, series)
+    weekly_comparison, goal_progress = weekly_progress(habit, daily_data, series)
+    return {
+        'label': habit.label,
+        'valueKey': habit.value_key,
+        'weeklyComparison': weekly_comparison,
+        'goalProgress': goal_progress,
+        'streaks': {k: v for k, v in streaks.items() if k != 'history'}
+    }
+
+# ========== Live Updates ==========
+def watermarks(c, habit_list):
+    """{habit name: highest session id}, in one statement.
+
+    AUTOINCREMENT ids only grow, so these move on every insert, whichever
+    process (another server worker, importer.py, a seed script) made it.
+    """
+    c.execute('\nUNION ALL\n'.join(
+        f"SELECT '{habit.name}', COALESCE(MAX(id), 0) FROM {habit.sessions}" for habit in habit_list))
+    return dict(c.fetchall())
+
+# More days than this in one update and the stream asks clients to refetch
+MAX_UPDATE_DAYS = 31
+
+def build_update(c, habit, since, until, today=None):
+    """What rows since < id <= until changed on the habit's dashboard, for /api/stream.
+
+    days has the new totals, session count, categories and heatmap
+    intensity of every day those rows landed on. balanceDelta and
+    hourlyDelta are what the rows add to the category balance (last 30
+    days) and the hour histogram, so a client applies them only if its
+    dashboard's watermark is since. The rest is the habit's overview entry,
+    read fresh from the rollup. Returns None when the rows touch more than
+    MAX_UPDATE_DAYS days (e.g. an import), where a refetch is cheaper.
+    """
+    value, category, key = habit.value_column, habit.category_column, habit.value_key
+    today = today or date.today()
+    hour = 'hour' if habit.has_time else 'NULL'
+    c.execute(f'''
+        SELECT date, {category}_id, {hour}, SUM({value})
+        FROM {habit.sessions}
+        WHERE id > ? AND id <= ?
+        GROUP BY date, {category}_id, {hour}
+    ''', (since, until))
+    rows = c.fetchall()
+    dates = sorted({row[0] for row in rows})
+    if len(dates) > MAX_UPDATE_DAYS:
+        return None
+
+    # Same cut-off as build_dashboard's category balance
+    thirty_days_ago = (today - timedelta(days=30)).isoformat()
+    balance, hours = {}, {}
+    for day, category_id, hour_of_day, total in rows:
+        if day >= thirty_days_ago:
+            balance[category_id] = balance.get(category_id, 0) + total
+        if hour_of_day is not None:
+            hours[hour_of_day] = hours.get(hour_of_day, 0) + total
+
+    placeholders = ', '.join('?' * len(dates))
+    c.execute(f'''
+        SELECT t.date, t.{value}, t.sessions,
+               (SELECT GROUP_CONCAT(DISTINCT s.{category}_id) FROM {habit.sessions} s WHERE s.date = t.date)
+        FROM {habit.totals} t
+        WHERE t.date IN ({placeholders})
+        ORDER BY t.date
+    ''', dates)
+    totals = [(day, total, sessions, split_ids(categories)) for day, total, sessions, categories in c.fetchall()]
+    names = category_names(c, habit, {category_id for *_, ids in totals for category_id in ids}
+                           | set(balance))
+    days = [{
+        'date': day,
+        key: total,
+        'sessions': sessions,
+        habit.calendar_key: sorted(names[category_id] for category_id in ids),
+        'intensity': calendar_intensity(habit, total)
+    } for day, total, sessions, ids in totals]
+
+    update = {
+        'habit': habit.name,
+        'since': since,
+        'watermark': until,
+        'days': days,
+        'balanceDelta': [{habit.category_key: names[category_id], key: total}
+                         for category_id, total in sorted(balance.items(), key=lambda item: names[item[0]] or '')],
+    }
+    if habit.has_time:
+        update['hourlyDelta'] = [{'hour': hour_of_day, key: total} for hour_of_day, total in sorted(hours.items())]
+    update.update(habit_summary(habit, *fetch_overview_rows(c, [habit])[habit.name]))
+    return update
+
+# ========== Productive Hours ==========
+def get_hourly_data(c, habit, start=None, end=None, filters=None):
+    """(hourlyData, weekdayHourly) for a habit with a time column.
+
+    weekdayHourly is a 7x24 grid of totals, Monday first. Unfiltered, both
+    come straight from the histogram tables. With a date range and/or
+    filters (a SessionFilter) they are summed from the stored hours instead,
+    through the (date, hour) or (<column>_id, date, hour) index.
+    """
+    value, key = habit.value_column, habit.value_key
+    grid = [[0] * 24 for _ in range(7)]
+    hours = {}
+    if start is None and end is None and filters is None:
+        c.execute(f'SELECT weekday, hour, {value} FROM {habit.weekday_hourly}')
+        for weekday, hour, total in c.fetchall():
+            grid[weekday][hour] = total
+        c.execute(f'SELECT hour, {value} FROM {habit.hourly}')
+        hours = dict(c.fetchall())
+    else:
+        conditions = ['date BETWEEN ? AND ?', 'hour IS NOT NULL']
+        params = [start or '0000-01-01', end or '9999-12-31']
+        if filters is not None:
+            condition, condition_params = filters.condition()
+            conditions.insert(0, condition)
+            params[:0] = condition_params
+        # Grouped by date (not weekday) so the groups follow the index order
+        c.execute(f'''
+            SELECT {WEEKDAY_SQL}, hour, SUM({value})
+            FROM {habit.sessions}
+            WHERE {' AND '.join(conditions)}
+            GROUP BY date, hour
+        ''', params)
+        for weekday, hour, total in c.fetchall():
+            if weekday is not None:  # malformed dates only count towards hourlyData
+                grid[weekday][hour] += total
+            hours[hour] = hours.get(hour, 0) + total
+    hourly_data = [{'hour': hour, key: total} for hour, total in sorted(hours.items())]
+    return hourly_data, grid
+
+# ========== Calendar ==========
+def calendar_intensity(habit, value):
+    """0-4 heatmap bucket for one day's total."""
+    if value == 0:
+        return 0
+    find = bisect_left if habit.intensity_inclusive else bisect_right
+    return find(habit.intensity_levels, value) + 1
+
+def get_calendar_year(c, habit, year, today, filters=None, ids=False):
+    """Heatmap cells for one year, rebuilt only after a row lands in that year.
+
+    Each cell lists its day's category names, or with ids=True their ids;
+    the two are cached apart. With filters (a SessionFilter) the cells only
+    count the matching sessions.
+    """
+    year_start, year_end = heatmap.year_bounds(year)
+    c.execute(f'''
+        SELECT COALESCE(SUM(sessions), 0)
+        FROM {habit.totals}
+        WHERE date BETWEEN ? AND ?
+    ''', (year_start, year_end))
+    # isToday/isFuture only move during the current year
+    key = (year, c.fetchone()[0], today if year == today.year else None,
+           filters.key if filters is not None else None, ids)
+    cells = habit.calendar_cache.get(key)
+    if cells is None:
+        condition, params = filters.condition() if filters is not None else ('', [])
+        c.execute(f'''
+            SELECT date, SUM({habit.value_column}) as total,
+                   GROUP_CONCAT(DISTINCT {habit.category_column}_id) as categories
+            FROM {habit.sessions}
+            WHERE date BETWEEN ? AND ?{f' AND {condition}' if condition else ''}
+            GROUP BY date
+        ''', [year_start, year_end] + params)
+        rows = c.fetchall()
+        # Days repeat a handful of category combinations; decode each one once
+        combinations = {text: split_ids(text) for text in {row[2] for row in rows}}
+        if not ids:
+            names = category_names(c, habit, {category_id for combination in combinations.values()
+                                              for category_id in combination})
+            combinations = {text: sorted(names[category_id] for category_id in combination)
+                            for text, combination in combinations.items()}
+        days = {day: (total or 0, combinations[text]) for day, total, text in rows}
+        cells = heatmap.build_year(year, days, today, lambda value: calendar_intensity(habit, value),
+                                   habit.value_key, habit.calendar_key)
+        habit.calendar_cache.put(key, cells)
+    return cells
+
+def get_calendar_data(c, habit, start, end, today, filters=None, ids=False):
+    """Calendar cells for the heatmap between start and end.
+
+    Each cell's habit.calendar_key lists the names of its day's categories,
+    or with ids=True their ids (see calendar_legend).
+    """
+    cells = []
+    for year in range(start.year, end.year + 1):
+        cells.extend(get_calendar_year(c, habit, year, today, filters, ids))
+    return heatmap.clip(cells, start, end)
+
+def calendar_legend(c, habit, cells):
+    """{id: name} of every category id in the cells."""
+    return category_names(c, habit, {category_id for cell in cells for category_id in cell[habit.calendar_key]})
+
+# ========== Inserts ==========
+DATE_PATTERN = re.compile(r'[0-9]{4}-[0-9]{2}-[0-9]{2}')
+# Every valid HH:MM time, with its minute of the day
+MINUTES_OF_DAY = {f'{hour:02d}:{minute:02d}': hour * 60 + minute for hour in range(24) for minute in range(60)}
+
+def parse_session(habit, row):
+    """Validate one posted row and return it as a tuple in habit.columns order.
+
+    The category is required; other text columns default to ''. Raises
+    ValueError describing the first problem found.
+    """
+    if not isinstance(row, dict):
+        raise ValueError('expected an object')
+    required = ['date', habit.value_column, habit.category_column]
+    if habit.has_time:
+        required.insert(1, 'time')
+    missing = [field for field in required if field not in row]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+
+    date_str = row['date']
+    time_str = row['time'] if habit.has_time else '00:00'
+    # fromisoformat alone also takes other ISO forms, e.g. '2026-W42-7' (3.11+)
+    if not isinstance(date_str, str) or not DATE_PATTERN.fullmatch(date_str):
+        raise ValueError(f"date must be YYYY-MM-DD, got {date_str!r}")
+    try:
+        date.fromisoformat(date_str)  # strptime is ~20x slower per row
+    except ValueError:
+        raise ValueError(f"date must be YYYY-MM-DD, got {date_str!r}")
+    if not isinstance(time_str, str) or time_str not in MINUTES_OF_DAY:
+        raise ValueError(f"time must be HH:MM, got {time_str!r}")
+
+    value = row[habit.value_column]
+    # NaN passes both comparisons, and neither NaN nor Infinity can be stored or sent as JSON
+    if isinstance(value, bool) or not isinstance(value, (int, float)) \
+            or (isinstance(value, float) and not math.isfinite(value)) \
+            or value <= 0 or (habit.max_value is not None and value > habit.max_value):
+        bound = f'between 0 and {habit.max_value}' if habit.max_value is not None else 'greater than 0'
+        raise ValueError(f"{habit.value_column} must be a number {bound}, got {value!r}")
+
+    parsed = []
+    for column in habit.columns:
+        if column in ('date', 'time') or column == habit.value_column:
+            parsed.append(row[column])
+            continue
+        text = row.get(column, '')
+        if not isinstance(text, str) or (column == habit.category_column and not text.strip()):
+            raise ValueError(f"{column} must be a non-empty string"
+                             if column == habit.category_column else f"{column} must be a string")
+        parsed.append(text)
+    return tuple(parsed)
+
+def stored_row(habit, row):
+    """A parsed row with its derived columns appended, in stored_columns + natural_key order.
+
+    For habits with a time that's its hour and minute of day, looked up in
+    MINUTES_OF_DAY, which parse_session checked the time against; then the
+    row's natural_key. The lookup columns still hold their names;
+    with_lookup_ids swaps them for ids just before the insert.
+    """
+    derived = ()
+    if habit.has_time:
+        minute_of_day = MINUTES_OF_DAY[row[habit.columns.index('time')]]
+        derived = (minute_of_day // 60, minute_of_day)
+    return row + derived + (natural_key(*row),)
+
+def lookup_ids(c, habit, column, names):
+    """{name: id} for names in the column's lookup table, adding the ones it lacks.
+
+    Known names come from habit.name_maps; only new ones touch the table.
+    """
+    ids = habit.name_maps[column].ids(names)
+    missing = [name for name in names if name not in ids]
+    if missing:
+        lookup = habit.lookups[column]
+        c.executemany(f'INSERT OR IGNORE INTO {lookup} (name) VALUES (?)', [(name,) for name in missing])
+        c.execute(f"SELECT name, id FROM {lookup} WHERE name IN ({', '.join('?' * len(missing))})", missing)
+        ids.update(c.fetchall())
+    return ids
+
+def with_lookup_ids(c, habit, rows):
+    """Stored rows (see stored_row) with each lookup column's name replaced by its id."""
+    ids = {}
+    for column in habit.lookups:
+        index = habit.columns.index(column)
+        ids[index] = lookup_ids(c, habit, column, {row[index] for row in rows if row[index] is not None})
+    return [tuple(ids[index].get(value) if index in ids else value for index, value in enumerate(row))
+            for row in rows]
+
+def insert_sessions(conn, habit, rows):
+    """Insert parsed rows and fold them into the rollups, in one transaction.
+
+    Duplicates are inserted as posted; only imports skip them.
+    """
+    date_index = habit.columns.index('date')
+    value_index = habit.columns.index(habit.value_column)
+    rows = [stored_row(habit, row) for row in rows]
+    totals = {}
+    for row in rows:
+        day = totals.setdefault(row[date_index], [0, 0])
+        day[0] += row[value_index]
+        day[1] += 1
+    if habit.has_time:
+        hour_index = len(habit.columns)
+        weekdays = {}
+        hourly = {}
+        weekday_hourly = {}
+        for row in rows:
+            hour = row[hour_index]
+            weekday = weekdays.get(row[date_index])
+            if weekday is None:
+                weekday = weekdays[row[date_index]] = date.fromisoformat(row[date_index]).weekday()
+            for bucket in (hourly.setdefault(hour, [0, 0]),
+                           weekday_hourly.setdefault((weekday, hour), [0, 0])):
+                bucket[0] += row[value_index]
+                bucket[1] += 1
+    columns = habit.stored_columns + ('natural_key',)
+    c = conn.cursor()
+    c.executemany(f'''
+        INSERT INTO {habit.sessions} ({', '.join(columns)})
+        VALUES ({', '.join('?' * len(columns))})
+    ''', with_lookup_ids(c, habit, rows))
+    update_daily_totals(c, habit, totals)
+    if habit.has_time:
+        update_hourly_totals(c, habit, hourly, weekday_hourly)
+    conn.commit()
@@ -0,0 +1,96 @@
+"""Calendar heatmap grids shared by the habit apps.
+
+Each app builds one calendar year at a time with build_year and caches it per
+(year, data version); ranges spanning several years are stitched together
+from those per-year grids and clipped to the requested dates.
+"""
+from datetime import date
+
+MAX_CALENDAR_YEARS = 20
+
+def parse_range(args, today):
+    """(start, end) dates from ?year= or ?from=&to=; defaults to today's year."""
+    if args.get('year'):
+        try:
+            year = int(args['year'])
+        except ValueError:
+            raise ValueError(f"invalid year {args['year']!r}")
+        if not 1 <= year <= 9999:
+            raise ValueError(f"year out of range: {year}")
+        return date(year, 1, 1), date(year, 12, 31)
+
+    try:
+        start = date.fromisoformat(args['from']) if args.get('from') else date(today.year, 1, 1)
+        end = date.fromisoformat(args['to']) if args.get('to') else date(start.year, 12, 31)
+    except ValueError as e:
+        raise ValueError(f"dates must be YYYY-MM-DD ({e})")
+    if start > end:
+        raise ValueError('from must not be after to')
+    if end.year - start.year >= MAX_CALENDAR_YEARS:
+        raise ValueError(f"range spans more than {MAX_CALENDAR_YEARS} years")
+    return start, end
+
+def year_bounds(year):
+    """First and last day of a year as 'YYYY-MM-DD' strings."""
+    return date(year, 1, 1).isoformat(), date(year, 12, 31).isoformat()
+
+def build_year(year, days, today, intensity, value_key='hours', category_key='topics'):
+    """Heatmap cells for every day of one year.
+
+    days maps 'YYYY-MM-DD' to (value, categories) for days with data and
+    intensity turns a value into a 0-4 bucket. Week numbers keep the original
+    layout: columns count Mondays from the Monday on or before Jan 1, starting
+    at 2.
+    """
+    first = date(year, 1, 1).toordinal()
+    last = date(year, 12, 31).toordinal()
+    grid_start = first - date(year, 1, 1).weekday()
+    today = today.toordinal()
+    empty = (0, [])
+
+    cells = []
+    for ordinal in range(first, last + 1):
+        day = date.fromordinal(ordinal)
+        date_str = day.isoformat()
+        value, categories = days.get(date_str, empty)
+        offset = ordinal - grid_start
+        weekday = offset % 7
+        week = offset // 7 + 2
+        is_future = ordinal > today
+        cells.append({
+            'date': date_str,
+            'day': day.day,
+            'month': day.month,
+            'year': year,
+            'weekday': weekday,  # 0 = Monday, 6 = Sunday
+            'week': week,
+            'gridColumn': week,
+            value_key: value,
+            'intensity': 0 if is_future else intensity(value),
+            category_key: categories,
+            'isToday': ordinal == today,
+            'isWeekend': weekday >= 5,
+            'isFuture': is_future
+        })
+    return cells
+
+def clip(cells, start, end):
+    """Cells (sorted by date) that fall between start and end inclusive."""
+    start, end = start.isoformat(), end.isoformat()
+    return [cell for cell in cells if start <= cell['date'] <= end]
+
+def to_columns(cells, value_key='hours', category_key='topics'):
+    """Parallel arrays instead of one dict per day.
+
+    Only the fields the client can't derive from the date are kept; month,
+    weekend and today/future flags follow from 'date' and the response's
+    'today'.
+    """
+    return {
+        'date': [cell['date'] for cell in cells],
+        'week': [cell['week'] for cell in cells],
+        'weekday': [cell['weekday'] for cell in cells],
+        value_key: [cell[value_key] for cell in cells],
+        'intensity': [cell['intensity'] for cell in cells],
+        category_key: [cell[category_key] for cell in cells]
+    }
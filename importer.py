@@ -0,0 +1,192 @@
+"""Bulk import of sessions from CSV or NDJSON, skipping ones already stored.
+
+Records stream in one at a time. Each is renamed through an optional
+column mapping (e.g. Subject:topic), validated with habits.parse_session
+and inserted behind a NOT EXISTS probe on the natural_key index, so
+re-running an import, or importing overlapping exports, adds every
+session once. The whole import is one transaction: readers keep seeing
+the old rows until it commits, and a failure leaves nothing behind. With
+defer_indexes the table's other indexes are dropped for the load and
+built once at the end, in the same transaction, which beats updating
+them row by row when the import is large.
+
+    python importer.py study sessions.csv --map Subject:topic,Duration:hours
+    python importer.py sleep - --format ndjson < sleep.ndjson
+"""
+import argparse
+import csv
+import json
+import math
+import sys
+import time
+
+import habits
+from db import ConnectionPool
+
+IMPORT_BATCH = 20000  # rows per executemany
+MAX_REPORTED_ERRORS = 100
+
+def parse_mapping(spec):
+    """{'Subject': 'topic', ...} from 'Subject:topic,...'; raises ValueError."""
+    mapping = {}
+    for pair in filter(None, (part.strip() for part in (spec or '').split(','))):
+        source, sep, target = pair.partition(':')
+        if not sep or not source.strip() or not target.strip():
+            raise ValueError(f"column mapping must look like source:column, got {pair!r}")
+        mapping[source.strip()] = target.strip()
+    return mapping
+
+def csv_records(lines):
+    """(index, record, error) per CSV data row; index 0 is the row after the header."""
+    for i, record in enumerate(csv.DictReader(lines)):
+        yield i, record, None
+
+def ndjson_records(lines):
+    """(index, record, error) per non-blank line; error is set for lines that don't parse."""
+    for i, line in enumerate(lines):
+        if not line.strip():
+            continue
+        try:
+            yield i, json.loads(line), None
+        except ValueError as e:
+            yield i, None, f"invalid JSON ({e})"
+
+def prepare(habit, record, mapping=None):
+    """record with its keys renamed through mapping and a numeric-text value made a number."""
+    if not isinstance(record, dict):
+        return record  # parse_session rejects it
+    if mapping:
+        record = {mapping.get(key, key): value for key, value in record.items()}
+    value = record.get(habit.value_column)
+    if isinstance(value, str):
+        try:
+            number = float(value)
+        except ValueError:
+            return record  # parse_session reports it
+        # float() also reads 'nan' and 'inf'; left as text, parse_session rejects them as written
+        if math.isfinite(number):
+            record[habit.value_column] = number
+    return record
+
+def drop_indexes(c, habit):
+    """Drop the table's indexes except natural_key's; returns the SQL that recreates them."""
+    c.execute(f'''
+        SELECT name, sql FROM {habit.name}.sqlite_master
+        WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL
+    ''', (habit.table,))
+    recreate = []
+    for name, sql in c.fetchall():
+        if name == f'idx_{habit.table}_natural_key':
+            continue  # the duplicate probe needs it
+        c.execute(f'DROP INDEX {habit.name}.{name}')
+        # sqlite_master keeps the statement without the schema name
+        recreate.append(sql.replace(f'INDEX {name}', f'INDEX {habit.name}.{name}', 1))
+    return recreate
+
+def insert_batch(c, habit, insert, key_index, batch):
+    # The natural_key goes in twice: once stored, once for the duplicate probe
+    c.executemany(insert, [row + (row[key_index],) for row in habits.with_lookup_ids(c, habit, batch)])
+
+def import_records(conn, habit, records, mapping=None, defer_indexes=False):
+    """Insert the new sessions among (index, record, error) triples, in one transaction.
+
+    Returns {'inserted', 'duplicates', 'rejected', 'errors'}; errors lists
+    the first MAX_REPORTED_ERRORS rejected rows. The rollups are updated
+    from the inserted rows in one set-based pass at the end.
+    """
+    columns = habit.stored_columns + ('natural_key',)
+    key_index = len(habit.stored_columns)
+    insert = f'''
+        INSERT INTO {habit.sessions} ({', '.join(columns)})
+        SELECT {', '.join('?' * len(columns))}
+        WHERE NOT EXISTS (SELECT 1 FROM {habit.sessions} WHERE natural_key = ?)
+    '''
+    valid = rejected = 0
+    errors = []
+    if conn.in_transaction:
+        conn.commit()
+    c = conn.cursor()
+    # Take the write lock before reading the watermark: a deferred transaction
+    # that reads, then writes after another connection committed, fails with
+    # SQLITE_BUSY_SNAPSHOT, which busy_timeout doesn't retry
+    c.execute('BEGIN IMMEDIATE')
+    try:
+        watermark = c.execute(f'SELECT COALESCE(MAX(id), 0) FROM {habit.sessions}').fetchone()[0]
+        recreate = drop_indexes(c, habit) if defer_indexes else []
+        batch = []
+        for index, record, error in records:
+            if error is None:
+                try:
+                    row = habits.stored_row(habit, habits.parse_session(habit, prepare(habit, record, mapping)))
+                except ValueError as e:
+                    error = str(e)
+            if error is not None:
+                rejected += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({'row': index, 'error': error})
+                continue
+            valid += 1
+            batch.append(row)
+            if len(batch) >= IMPORT_BATCH:
+                insert_batch(c, habit, insert, key_index, batch)
+                batch = []
+        if batch:
+            insert_batch(c, habit, insert, key_index, batch)
+
+        c.execute(f'SELECT COUNT(*) FROM {habit.sessions} WHERE id > ?', (watermark,))
+        inserted = c.fetchone()[0]
+        habits.fold_rollups_since(c, habit, watermark)
+        for statement in recreate:
+            c.execute(statement)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return {
+        'inserted': inserted,
+        'duplicates': valid - inserted,
+        'rejected': rejected,
+        'errors': errors
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('habit', choices=list(habits.REGISTRY))
+    parser.add_argument('file', help='CSV or NDJSON file, or - for stdin')
+    parser.add_argument('--format', choices=('csv', 'ndjson'),
+                        help='default: .ndjson/.jsonl files are NDJSON, anything else CSV')
+    parser.add_argument('--map', default='', help='source:column pairs, e.g. Subject:topic,Duration:hours')
+    parser.add_argument('--database', help="default: the habit's own database")
+    parser.add_argument('--keep-indexes', action='store_true',
+                        help='update the indexes row by row instead of rebuilding them after the load')
+    args = parser.parse_args()
+
+    habit = habits.REGISTRY[args.habit]
+    try:
+        mapping = parse_mapping(args.map)
+    except ValueError as e:
+        parser.error(str(e))
+    fmt = args.format or ('ndjson' if args.file.endswith(('.ndjson', '.jsonl')) else 'csv')
+
+    # Same pragmas as the app, with the database attached under the habit's name
+    conn = ConnectionPool(':memory:', {habit.name: args.database or habit.database}).connect()
+    source = sys.stdin if args.file == '-' else open(args.file, newline='', encoding='utf-8')
+    try:
+        habits.init_db(conn, habit)
+        records = csv_records(source) if fmt == 'csv' else ndjson_records(source)
+        start = time.perf_counter()
+        result = import_records(conn, habit, records, mapping, defer_indexes=not args.keep_indexes)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        conn.close()
+
+    print(f"✅ {result['inserted']:,} {habit.name} rows imported, {result['duplicates']:,} duplicates "
+          f"skipped, {result['rejected']:,} rejected in {time.perf_counter() - start:.1f}s")
+    for error in result['errors'][:10]:
+        print(f"  row {error['row']}: {error['error']}")
+    if result['rejected'] > 10:
+        print(f"  ... {result['rejected'] - 10:,} more")
+
+if __name__ == '__main__':
+    main()
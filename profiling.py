@@ -0,0 +1,178 @@
+"""Request instrumentation for the dashboard routes.
+
+A route wrapped in profiled() gets one SectionTimer per request
+(current_timer()) and calls lap() after each section. Laps are cheap, so
+they are always recorded: every response carries them in a Server-Timing
+header, and the last PROFILE_HISTORY reports are kept for
+/api/debug/profile.
+
+The rest is opt-in. With ?timings=1 the route traces its connection, so
+the report also lists every SQL statement with its duration, and the
+route adds that report to its JSON under '_timings'. ?profile=1 does the
+same and also runs the view under cProfile, dumping a .pstats file into
+PROFILE_DIR (open it with `python -m pstats <file>`), where only the newest
+PROFILE_FILES are kept.
+
+?profile=1 and /api/debug/profile are only on in debug mode or with
+HABITS_PROFILING=1, since they skip the response cache, write to disk and
+show every recent request; elsewhere ?profile=1 is ignored.
+"""
+import cProfile
+import functools
+import os
+import tempfile
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+from flask import current_app, g, request
+
+PROFILE_HISTORY = 50
+PROFILE_DIR = os.environ.get('HABITS_PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'habits-profiles'))
+PROFILE_FILES = 20
+PROFILING = os.environ.get('HABITS_PROFILING') == '1'
+# SQLite VM instructions between progress callbacks while tracing
+PROGRESS_STEPS = 100
+
+_recent = deque(maxlen=PROFILE_HISTORY)
+
+class SectionTimer:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.queries = 0
+        self.statements = []
+        self.sections = {}
+        self._start = self._last = time.perf_counter()
+
+    def lap(self, name):
+        """Charge the time since the previous lap to section name."""
+        now = time.perf_counter()
+        self.sections[name] = self.sections.get(name, 0.0) + (now - self._last) * 1000
+        self._last = now
+
+    @contextmanager
+    def tracing(self, conn):
+        """Record the SQL statements run on conn inside the block, with durations.
+
+        The trace callback fires when a statement starts and the progress
+        handler ticks every PROGRESS_STEPS VM instructions while it runs, so
+        a statement lasts from its start to its last tick; one too short to
+        tick shows as 0 ms.
+        """
+        if not self.enabled:
+            yield
+            return
+
+        current = None
+
+        def finish():
+            if current is not None:
+                sql, started, last_tick = current
+                self.statements.append({
+                    'sql': ' '.join(sql.split())[:200],
+                    'ms': round((last_tick - started) * 1000, 3)
+                })
+
+        def trace(statement):
+            nonlocal current
+            finish()
+            now = time.perf_counter()
+            current = [statement, now, now]
+            self.queries += 1
+
+        def progress():
+            if current is not None:
+                current[2] = time.perf_counter()
+            return 0  # keep running
+
+        conn.set_trace_callback(trace)
+        conn.set_progress_handler(progress, PROGRESS_STEPS)
+        try:
+            yield
+        finally:
+            # Pooled connections outlive the request
+            conn.set_trace_callback(None)
+            conn.set_progress_handler(None, 0)
+            finish()
+
+    def sql_ms(self):
+        return sum(statement['ms'] for statement in self.statements)
+
+    def report(self):
+        report = {
+            'queries': self.queries,
+            'totalMs': round((time.perf_counter() - self._start) * 1000, 3),
+            'sections': {name: round(ms, 3) for name, ms in self.sections.items()}
+        }
+        if self.enabled:
+            report['sqlMs'] = round(self.sql_ms(), 3)
+            report['statements'] = list(self.statements)
+        return report
+
+    def server_timing(self):
+        """The laps as a Server-Timing header value, e.g. 'query;dur=1.2, total;dur=3.4'."""
+        metrics = [f'{name};dur={ms:.3f}' for name, ms in self.sections.items()]
+        if self.enabled:
+            metrics.append(f'sql;dur={self.sql_ms():.3f}')
+        metrics.append(f'total;dur={(time.perf_counter() - self._start) * 1000:.3f}')
+        return ', '.join(metrics)
+
+def current_timer():
+    """The SectionTimer of the request a profiled() route is serving."""
+    timer = g.get('section_timer')
+    return timer if timer is not None else SectionTimer()
+
+def enabled():
+    """Whether ?profile=1 and /api/debug/profile are on for the current app."""
+    return PROFILING or current_app.debug
+
+def profile_requested():
+    return request.args.get('profile') == '1' and enabled()
+
+def prune_profiles(keep=PROFILE_FILES):
+    """Delete all but the newest keep .pstats files in PROFILE_DIR."""
+    # The names start with their timestamp, so they sort oldest first
+    names = sorted(name for name in os.listdir(PROFILE_DIR) if name.endswith('.pstats'))
+    for name in names[:max(len(names) - keep, 0)]:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, name))
+        except FileNotFoundError:
+            pass  # another worker pruned it first
+
+def recent_profiles(n=PROFILE_HISTORY):
+    """Reports of the last n profiled requests, newest first."""
+    return list(_recent)[:n]
+
+def profiled(view):
+    """Time a route: Server-Timing header, profile history, ?timings=1 and ?profile=1."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        profile = profile_requested()
+        timer = g.section_timer = SectionTimer(profile or request.args.get('timings') == '1')
+
+        if profile:
+            profiler = cProfile.Profile()
+            response = current_app.make_response(profiler.runcall(view, *args, **kwargs))
+        else:
+            response = current_app.make_response(view(*args, **kwargs))
+        # Whatever followed the view's last lap: jsonify, or serving cached bytes
+        timer.lap('response')
+
+        entry = {
+            'path': request.full_path.rstrip('?'),
+            'status': response.status_code,
+            'at': datetime.now().isoformat(timespec='milliseconds'),
+            **timer.report()
+        }
+        if profile:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            path = os.path.join(PROFILE_DIR, f'{datetime.now():%Y%m%d-%H%M%S-%f}-{request.endpoint}.pstats')
+            profiler.dump_stats(path)
+            prune_profiles()
+            entry['pstats'] = path
+            response.headers['X-Profile-File'] = path
+        _recent.appendleft(entry)
+        response.headers['Server-Timing'] = timer.server_timing()
+        return response
+    return wrapper
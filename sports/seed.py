@@ -2,23 +2,23 @@ import sqlite3
 import random
 from datetime import datetime, timedelta
 import os
+import sys
+
+# The app's habits module lives one directory up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import habits  # noqa: E402
 
 DATABASE = os.path.join(os.path.dirname(__file__), 'sports.db')
 
+HABIT = habits.REGISTRY['sports']
+
 def init_db():
-    with sqlite3.connect(DATABASE) as conn:
-        c = conn.cursor()
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS sports_sessions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date TEXT,
-                time TEXT,
-                duration REAL,
-                activity TEXT,
-                location TEXT
-            )
-        ''')
-        conn.commit()
+    """Connection with DATABASE attached, its tables created and migrated the app's way."""
+    conn = sqlite3.connect(':memory:')
+    conn.execute(f'ATTACH DATABASE ? AS {HABIT.name}', (DATABASE,))
+    habits.init_db(conn, HABIT)
+    return conn
 
 def pick_activity():
     activities = [
@@ -74,21 +74,15 @@ def generate_sessions(start_date, end_date):
     return sessions
 
 def seed_data():
-    init_db()
-    
     # Generate data for the year 2025
     start_date = datetime(2025, 1, 1).date()
     end_date = datetime(2025, 12, 31).date()
     
     sessions = generate_sessions(start_date, end_date)
     
-    with sqlite3.connect(DATABASE) as conn:
-        c = conn.cursor()
-        c.executemany('''
-            INSERT INTO sports_sessions (date, time, duration, activity, location)
-            VALUES (:date, :time, :duration, :activity, :location)
-        ''', sessions)
-        conn.commit()
+    with init_db() as conn:
+        habits.insert_sessions(conn, HABIT, [tuple(session[column] for column in HABIT.columns)
+                                             for session in sessions])
     
     print("Year of realistic sports activity data inserted.")
 
@@ -1,23 +1,24 @@
+import os
 import sqlite3
+import sys
 from datetime import datetime, timedelta
 import random
 
+# The app's habits module lives one directory up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import habits  # noqa: E402
+
 DATABASE = 'studying.db'
 
+HABIT = habits.REGISTRY['study']
+
 def init_db():
-    with sqlite3.connect(DATABASE) as conn:
-        c = conn.cursor()
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS study_sessions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date TEXT,
-                time TEXT,
-                hours REAL,
-                topic TEXT,
-                location TEXT
-            )
-        ''')
-        conn.commit()
+    """Connection with DATABASE attached, its tables created and migrated the app's way."""
+    conn = sqlite3.connect(':memory:')
+    conn.execute(f'ATTACH DATABASE ? AS {HABIT.name}', (DATABASE,))
+    habits.init_db(conn, HABIT)
+    return conn
 
 def pick_location(hour):
     if hour < 18:
@@ -54,11 +55,11 @@ def generate_sessions(date, is_recent=False):
     return sessions
 
 def seed_data():
-    init_db()
-    with sqlite3.connect(DATABASE) as conn:
+    with init_db() as conn:
         c = conn.cursor()
-        c.execute('DELETE FROM study_sessions')
+        c.execute(f'DELETE FROM {HABIT.sessions}')
 
+        sessions = []
         today = datetime.now()
         for i in range(365):
             date = today - timedelta(days=i)
@@ -72,13 +73,11 @@ def seed_data():
                 continue
 
             is_recent = i < 30  # last 30 days should have full data
-            for session in generate_sessions(date, is_recent):
-                c.execute('''
-                    INSERT INTO study_sessions (date, time, hours, topic, location)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', session)
+            sessions.extend(generate_sessions(date, is_recent))
 
-        conn.commit()
+        habits.insert_sessions(conn, HABIT, sessions)
+        # The rollups still counted the deleted rows; recompute them from the table
+        habits.rebuild_rollups(conn, HABIT)
         print("✅ Year of realistic study data inserted.")
 
 if __name__ == '__main__':